@@ -0,0 +1,226 @@
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from scrape_email import harvest_page_async, PARALLEL_CONTACT_PAGES
+from browser_pool import DEFAULT_USER_AGENT
+from http_scrape_email import scrape_website_for_emails_http
+from resource_blocking import apply_routing_profile_async
+from email_cache import get_email_cache, cache_key
+from consent import dismiss_consent_banner_async
+from crawl_frontier import CrawlFrontier
+from metrics import EMAIL_CACHE_REQUESTS, SITES_CRAWLED, CRAWL_SECONDS, PAGES_PER_SITE
+from collections import defaultdict
+from urllib.parse import urlparse
+import asyncio
+import time
+
+# Defaults for the async crawl engine
+MAX_CONCURRENT_PAGES = 50   # Total pages open across all sites at once
+PER_HOST_LIMIT = 2          # Pages open against a single host at once
+MAX_CONCURRENT_SITES = 20   # Sites (each with its own browser context) crawled in the browser at once
+ROUTING_PROFILE = 'crawler' # See resource_blocking.ROUTING_PROFILES
+
+
+class AsyncEmailCrawler:
+    """
+    Crawls many websites for emails concurrently on a single browser.
+
+    A global semaphore caps the number of pages open at once, and a per-host
+    semaphore keeps us from hammering any one site. Every site gets its own
+    isolated context, so cookies never leak between businesses; a site semaphore
+    caps how many of those contexts are alive at once. After the homepage,
+    up to parallel_pages contact-like links of a site are loaded at once (still capped
+    by per_host_limit), and the rest are cancelled once min_emails_required is met.
+    """
+
+    def __init__(
+        self,
+        browser,
+        max_concurrent_pages: int = MAX_CONCURRENT_PAGES,
+        per_host_limit: int = PER_HOST_LIMIT,
+        routing_profile=ROUTING_PROFILE,
+        parallel_pages: int = PARALLEL_CONTACT_PAGES,
+        max_concurrent_sites: int = MAX_CONCURRENT_SITES
+    ):
+        self.browser = browser
+        self.routing_profile = routing_profile
+        self.site_budget = asyncio.Semaphore(max(1, max_concurrent_sites))
+        self.page_budget = asyncio.Semaphore(max(1, max_concurrent_pages))
+        self.per_host_limit = max(1, per_host_limit)
+        self.parallel_pages = max(1, parallel_pages)
+        self.host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+
+    async def _visit(self, context, url: str) -> tuple[set[str], list[tuple[float, str]], str]:
+        """Loads one URL and returns the emails found, its ranked (score, url) contact-like links and the final URL."""
+        host = urlparse(url).netloc
+        async with self.page_budget, self.host_limits[host]:
+            page = await context.new_page()
+            try:
+                await page.goto(url, wait_until="domcontentloaded")
+                await dismiss_consent_banner_async(page)
+
+                # Links come back resolved against page.url, which may differ from url after a redirect
+                emails_from_content, mailto_emails, candidate_links = await harvest_page_async(page, page.url)
+                return emails_from_content | mailto_emails, candidate_links, page.url
+            finally:
+                await page.close()
+
+    async def scrape_website_for_emails(
+        self,
+        initial_url: str,
+        search_contact_pages: bool = True,
+        max_depth: int = 1,
+        max_contact_links_per_page: int = 5,
+        min_emails_required: int = None,
+        http_first: bool = True
+    ) -> list[str]:
+        """Async counterpart of scrape_email.scrape_website_for_emails with the same return contract."""
+        if not initial_url.startswith(('http://', 'https://')):
+            initial_url = 'https://' + initial_url
+
+        if http_first:
+            start = time.perf_counter()
+            crawl_info = {}
+            emails, needs_browser = await asyncio.to_thread(
+                scrape_website_for_emails_http,
+                initial_url, search_contact_pages, max_depth, max_contact_links_per_page, min_emails_required,
+                crawl_info=crawl_info
+            )
+            found = bool(emails) and not needs_browser
+            SITES_CRAWLED.inc(tier='http', outcome='found' if found else 'escalated')
+            CRAWL_SECONDS.observe(time.perf_counter() - start, tier='http')
+            PAGES_PER_SITE.observe(len(crawl_info.get('visited_urls', ())), tier='http')
+            if found:
+                return emails
+            http_emails = emails or []
+        else:
+            http_emails = []
+
+        base_domain = urlparse(initial_url).netloc
+        all_emails_found = set()
+        visited_urls = set()
+        frontier = CrawlFrontier(initial_url)
+
+        # Waits for a site slot before opening a context, so queued sites hold no browser resources
+        async with self.site_budget:
+            start = time.perf_counter()
+            context = await self.browser.new_context(user_agent=DEFAULT_USER_AGENT, java_script_enabled=True)
+            context.set_default_navigation_timeout(30000)
+            context.set_default_timeout(15000)
+            await apply_routing_profile_async(context, self.routing_profile)
+            try:
+                while frontier:
+                    batch = {}
+                    batch_size = 1 if not visited_urls else self.parallel_pages
+                    while frontier and len(batch) < batch_size:
+                        current_url, current_depth = frontier.pop()
+                        if urlparse(current_url).netloc != base_domain:
+                            continue
+                        visited_urls.add(current_url)
+                        batch[asyncio.ensure_future(self._visit(context, current_url))] = (current_url, current_depth)
+
+                    pending = set(batch)
+                    minimum_met = False
+                    try:
+                        while pending and not minimum_met:
+                            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                            for task in done:
+                                current_url, current_depth = batch[task]
+                                try:
+                                    emails, candidate_links, final_url = task.result()
+                                except PlaywrightTimeoutError as e_timeout:
+                                    print(f"Timeout error loading or interacting with page: {current_url} - {e_timeout}")
+                                    continue
+                                except Exception as e_page:
+                                    print(f"Error processing page {current_url}: {e_page}")
+                                    continue
+
+                                if current_depth == 0 and urlparse(final_url).netloc != base_domain:
+                                    # Follow the homepage redirect (e.g. example.com -> www.example.com)
+                                    base_domain = urlparse(final_url).netloc
+                                all_emails_found.update(emails)
+                                if min_emails_required is not None and len(all_emails_found) >= min_emails_required:
+                                    minimum_met = True
+                                elif search_contact_pages and current_depth < max_depth:
+                                    frontier.add_links(candidate_links, current_depth + 1, max_contact_links_per_page)
+                    finally:
+                        # Cancelling a visit closes its page, which aborts the load
+                        for task in pending:
+                            task.cancel()
+                        await asyncio.gather(*pending, return_exceptions=True)
+
+                    if minimum_met:
+                        break
+            finally:
+                await context.close()
+                SITES_CRAWLED.inc(tier='browser', outcome='found' if all_emails_found else 'empty')
+                CRAWL_SECONDS.observe(time.perf_counter() - start, tier='browser')
+                PAGES_PER_SITE.observe(len(visited_urls), tier='browser')
+
+        # The browser may find less than the static HTML did (bot walls, timeouts)
+        return sorted(all_emails_found | set(http_emails))
+
+
+async def crawl_websites_for_emails(
+    urls: list[str],
+    max_concurrent_pages: int = MAX_CONCURRENT_PAGES,
+    per_host_limit: int = PER_HOST_LIMIT,
+    max_concurrent_sites: int = MAX_CONCURRENT_SITES,
+    headless: bool = True,
+    use_cache: bool = True,
+    **scrape_kwargs
+) -> dict[str, list[str]]:
+    """
+    Crawls every URL concurrently on one browser. URLs with a fresh entry in the crawl
+    cache are answered from it without being crawled, and URLs with the same cache key
+    (the same domain, or the same page on a shared host such as facebook.com) share a
+    single crawl.
+
+    Returns:
+        A dict mapping each input URL to the list of unique emails found on it.
+    """
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+    results = {}
+
+    if use_cache:
+        cache = get_email_cache()
+        for url in unique_urls:
+            cached = cache.get(url)
+            EMAIL_CACHE_REQUESTS.inc(result='hit' if cached is not None else 'miss')
+            if cached is not None:
+                results[url] = cached['emails']
+        unique_urls = [url for url in unique_urls if url not in results]
+
+    # The first URL of each cache key (domain, or page on a shared host) is crawled; the others get its result
+    by_key = defaultdict(list)
+    for url in unique_urls:
+        by_key[cache_key(url) or url].append(url)
+    unique_urls = [urls_for_key[0] for urls_for_key in by_key.values()]
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        crawler = AsyncEmailCrawler(
+            browser, max_concurrent_pages, per_host_limit, max_concurrent_sites=max_concurrent_sites
+        )
+
+        async def crawl_one(url):
+            try:
+                results[url] = await crawler.scrape_website_for_emails(url, **scrape_kwargs)
+            except Exception as e:
+                print(f"Error scraping emails from {url}: {e}")
+                results[url] = []
+                return
+            if use_cache:
+                get_email_cache().put(url, results[url])
+
+        try:
+            await asyncio.gather(*(crawl_one(url) for url in unique_urls))
+        finally:
+            await browser.close()
+
+    for urls_for_key in by_key.values():
+        for url in urls_for_key[1:]:
+            results[url] = results.get(urls_for_key[0], [])
+    return results
+
+def scrape_websites_for_emails(urls: list[str], **kwargs) -> dict[str, list[str]]:
+    """Synchronous entry point for crawl_websites_for_emails."""
+    return asyncio.run(crawl_websites_for_emails(urls, **kwargs))
@@ -0,0 +1,106 @@
+"""
+Benchmarks email extraction against the legacy regex on a corpus of saved pages.
+
+    python benchmarks/bench_email_extraction.py                       # benchmarks/pages/*.html
+    python benchmarks/bench_email_extraction.py --fetch urls.txt      # save a corpus first
+    python benchmarks/bench_email_extraction.py --synthetic 200       # no corpus at hand
+
+Reports throughput for both extractors and which addresses only one of them finds.
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_extraction import extract_emails
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+LEGACY_EMAIL_REGEX = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+
+
+def legacy_extract_emails(text: str) -> set[str]:
+    """scrape_email.extract_emails_from_text before the compiled extractor."""
+    return set(re.findall(LEGACY_EMAIL_REGEX, text, re.IGNORECASE))
+
+def fetch_corpus(url_file: str, pages_dir: str) -> None:
+    from http_scrape_email import fetch_html
+    os.makedirs(pages_dir, exist_ok=True)
+    with open(url_file, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip()]
+    for i, url in enumerate(urls):
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        _, _, html = fetch_html(url)
+        if html:
+            with open(os.path.join(pages_dir, f"{i:05d}.html"), 'w', encoding='utf-8') as out:
+                out.write(html)
+    print(f"Saved corpus to {pages_dir}")
+
+def synthetic_corpus(count: int, seed: int = 7) -> list[str]:
+    """Hotel-site-like pages: lots of markup and script, a few real and a few fake addresses."""
+    rng = random.Random(seed)
+    words = ["hotel", "room", "booking", "breakfast", "suite", "florence", "contact", "reception", "guest"]
+    pages = []
+    for i in range(count):
+        parts = ['<html><head><script>var cfg={"cdn":"https://cdn.example.net/lib@3.6.0/dist/app.min.js"};</script></head><body>']
+        for _ in range(rng.randint(200, 800)):
+            parts.append(f'<div class="c{rng.randint(0, 99)}"><p>{" ".join(rng.choices(words, k=12))}</p>'
+                         f'<img srcset="/img/room{rng.randint(0, 9)}@2x.png 2x"></div>')
+        parts.append(f'<a href="mailto:info@hotel{i}.com">Email us</a>')
+        parts.append(f'<p>Reservations: booking [at] hotel{i} [dot] it</p>')
+        parts.append(f'<p>Manager: manager&#64;hotel{i}.com</p>')
+        parts.append('</body></html>')
+        pages.append(''.join(parts))
+    return pages
+
+def load_corpus(pages_dir: str) -> list[str]:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, '*.htm*'))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append(f.read())
+    return pages
+
+def bench(extract, pages: list[str], repeat: int) -> tuple[float, list[set[str]]]:
+    results = [extract(page) for page in pages]  # Warm-up, and the results we compare
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            extract(page)
+    return (time.perf_counter() - start) / repeat, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', default=PAGES_DIR, help='Directory of saved .html pages')
+    parser.add_argument('--fetch', metavar='URL_FILE', help='Save the pages listed in URL_FILE into --pages first')
+    parser.add_argument('--synthetic', type=int, metavar='N', help='Benchmark N generated pages instead')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_corpus(args.fetch, args.pages)
+    pages = synthetic_corpus(args.synthetic) if args.synthetic else load_corpus(args.pages)
+    if not pages:
+        sys.exit(f"No pages in {args.pages}. Use --fetch URL_FILE or --synthetic N.")
+
+    total_mb = sum(len(page) for page in pages) / 1e6
+    print(f"Corpus: {len(pages)} pages, {total_mb:.1f} MB")
+    legacy_seconds, legacy_results = bench(legacy_extract_emails, pages, args.repeat)
+    new_seconds, new_results = bench(extract_emails, pages, args.repeat)
+    print(f"legacy regex : {legacy_seconds * 1000:8.1f} ms  ({total_mb / legacy_seconds:7.1f} MB/s)")
+    print(f"extract_emails: {new_seconds * 1000:8.1f} ms  ({total_mb / new_seconds:7.1f} MB/s)  {legacy_seconds / new_seconds:.1f}x")
+
+    legacy_only, new_only = set(), set()
+    for old, new in zip(legacy_results, new_results):
+        old = {email.lower() for email in old}
+        legacy_only |= old - new
+        new_only |= new - old
+    print(f"Only legacy found {len(legacy_only)}: {sorted(legacy_only)[:15]}")
+    print(f"Only new found    {len(new_only)}: {sorted(new_only)[:15]}")
+
+if __name__ == '__main__':
+    main()
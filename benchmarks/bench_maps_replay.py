@@ -0,0 +1,275 @@
+"""
+Record-and-replay harness for benchmarking the Google Maps scraping loop offline.
+
+Record a live Maps session for a search term once (needs network):
+
+    python benchmarks/bench_maps_replay.py record "hotels in florence"
+
+Then replay it through Playwright routing as often as needed, without network:
+
+    python benchmarks/bench_maps_replay.py replay "hotels in florence" --runs 3 --json maps.json
+    python benchmarks/bench_maps_replay.py replay "hotels in florence" --baseline maps.json
+
+Both modes drive index.scrape_search_term, the same scroll/click/extract loop production
+uses, with a pipeline stub in place of email enrichment and all state (StateStore, place
+index, results) in a temporary directory of a fresh process. Replay reports cards handled
+and listings submitted (cards that passed the filters and were not duplicates) per minute,
+and the number of Playwright protocol calls (driver round-trips, which map onto CDP
+commands) per card and per listing. Listings are gated in --baseline comparisons, so runs
+are comparable only with the same LISTING_FILTERS.
+"""
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from playwright.sync_api import sync_playwright
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+# Query parameters that change from session to session (counters, session ids, cache busters)
+VOLATILE_QUERY_PARAMS = {'ech', 'psi', 'ei', 'vet', 'gs_ri', 'zx', '_', 'authuser', 'rlz'}
+# Gated in --baseline comparisons: (metric, higher_is_better)
+GATED_METRICS = {'listings_per_minute': True, 'protocol_calls_per_listing': False}
+
+
+def default_har_path(search_term: str) -> str:
+    return os.path.join(RECORDINGS_DIR, search_term.replace(' ', '_') + '.har')
+
+def normalize_url(url: str) -> str:
+    parsed = urlparse(url)
+    query = sorted((key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True) if key not in VOLATILE_QUERY_PARAMS)
+    return urlunparse(parsed._replace(query=urlencode(query), fragment=''))
+
+
+class ReplayPipeline:
+    """Stands in for EnrichmentPipeline: records what the Maps loop submits and does nothing else."""
+
+    def __init__(self):
+        self.records = []
+        self.finished_terms = []
+
+    def submit(self, place_data, csv_filename):
+        self.records.append(place_data)
+
+    def finish_term(self, search_term):
+        self.finished_terms.append(search_term)
+
+    def queue_depths(self):
+        return 0, 0
+
+
+class HarReplayer:
+    """
+    Serves recorded responses from a HAR file through context.route.
+
+    Requests are matched on method and URL, first exactly, then with VOLATILE_QUERY_PARAMS
+    removed, then on the path alone. Repeated requests for the same key get the recorded
+    responses in order. Anything unmatched is aborted, so replay never reaches the network.
+    """
+
+    def __init__(self, har_path: str):
+        with open(har_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)['log']['entries']
+        self.exact = defaultdict(deque)
+        self.normalized = defaultdict(deque)
+        self.by_path = defaultdict(deque)
+        for entry in entries:
+            response = entry.get('response') or {}
+            if response.get('status', 0) <= 0:
+                continue  # Aborted during recording (blocked resource)
+            request = entry['request']
+            method, url = request['method'], request['url']
+            parsed = urlparse(url)
+            self.exact[(method, url)].append(response)
+            self.normalized[(method, normalize_url(url))].append(response)
+            self.by_path[(method, parsed.netloc, parsed.path)].append(response)
+        self.stats = Counter()
+        self._served = set()
+
+    def _next(self, responses: deque):
+        # Hand out recordings in order, skipping those already served through another match level,
+        # then keep serving the last one
+        while len(responses) > 1 and id(responses[0]) in self._served:
+            responses.popleft()
+        response = responses.popleft() if len(responses) > 1 else responses[0]
+        self._served.add(id(response))
+        return response
+
+    def _lookup(self, method: str, url: str):
+        parsed = urlparse(url)
+        for level, table, key in (
+            ('exact', self.exact, (method, url)),
+            ('normalized', self.normalized, (method, normalize_url(url))),
+            ('path', self.by_path, (method, parsed.netloc, parsed.path)),
+        ):
+            if table.get(key):
+                return level, self._next(table[key])
+        return 'missed', None
+
+    def handle(self, route):
+        request = route.request
+        level, response = self._lookup(request.method, request.url)
+        self.stats[level] += 1
+        if response is None:
+            route.abort()
+            return
+        content = response.get('content') or {}
+        body = content.get('text') or ''
+        body = base64.b64decode(body) if content.get('encoding') == 'base64' else body.encode('utf-8')
+        headers = {
+            header['name']: header['value'] for header in response.get('headers', [])
+            if header['name'].lower() not in ('content-encoding', 'content-length', 'transfer-encoding')
+        }
+        route.fulfill(status=response['status'], headers=headers, body=body)
+
+    def install(self, context) -> None:
+        context.route("**/*", self.handle)
+
+
+class ProtocolCallCounter:
+    """Counts the Playwright driver calls made by our code (route handling excluded)."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self._original = None
+
+    def __enter__(self):
+        from playwright._impl._connection import Connection
+        original = Connection._send_message_to_server
+        counter = self
+
+        def counting_send(connection, channel_owner, method, params, no_reply=False):
+            if getattr(channel_owner, '_type', None) != 'Route':
+                counter.calls[method] += 1
+            return original(connection, channel_owner, method, params, no_reply)
+
+        self._original = original
+        Connection._send_message_to_server = counting_send
+        return self
+
+    def __exit__(self, *exc):
+        from playwright._impl._connection import Connection
+        Connection._send_message_to_server = self._original
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+def run_session(search_term: str, har_path: str, mode: str, headless: bool = True, chromium: str = None) -> dict:
+    """Runs index.scrape_search_term once in a scratch directory, recording to or replaying from har_path."""
+    har_path = os.path.abspath(har_path)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        os.makedirs('results', exist_ok=True)
+        try:
+            import index
+            from resource_blocking import apply_routing_profile
+            from state_store import StateStore
+
+            store = StateStore(os.path.join(workdir, 'scraper_state.db'))
+            pipeline = ReplayPipeline()
+            replayer = None
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=headless, executable_path=chromium)
+                if mode == 'record':
+                    os.makedirs(os.path.dirname(har_path), exist_ok=True)
+                    context = browser.new_context(record_har_path=har_path, record_har_content='embed')
+                    apply_routing_profile(context, index.MAPS_ROUTING_PROFILE)
+                else:
+                    context = browser.new_context()
+                    replayer = HarReplayer(har_path)
+                    replayer.install(context)
+                page = context.new_page()
+
+                with ProtocolCallCounter() as counter:
+                    start = time.perf_counter()
+                    index.scrape_search_term(page, search_term, pipeline, store)
+                    seconds = time.perf_counter() - start
+                context.close()  # Flushes the HAR when recording
+                browser.close()
+
+            # Cards include duplicates and filter rejections; listings are only the records submitted
+            cards = len(store.seen_card_ids(search_term))
+        finally:
+            os.chdir(cwd)
+
+    listings = len(pipeline.records)
+    result = {
+        'cards': cards,
+        'listings': listings,
+        'seconds': round(seconds, 2),
+        'cards_per_minute': round(cards / seconds * 60, 1) if seconds else 0,
+        'listings_per_minute': round(listings / seconds * 60, 1) if seconds else 0,
+        'protocol_calls': counter.total,
+        'protocol_calls_per_card': round(counter.total / cards, 2) if cards else None,
+        'protocol_calls_per_listing': round(counter.total / listings, 2) if listings else None,
+        'top_calls': dict(counter.calls.most_common(8)),
+    }
+    if replayer is not None:
+        result['replay'] = dict(replayer.stats)
+    return result
+
+def run_isolated(*args) -> dict:
+    """run_session in a fresh process, so module-level singletons (place index, pools) never leak between runs."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_session, *args).result()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('search_term')
+    parser.add_argument('--har', help='HAR file (default: benchmarks/recordings/<term>.har)')
+    parser.add_argument('--runs', type=int, default=1, help='Replay runs; the median run is reported')
+    parser.add_argument('--headed', action='store_true', help='Show the browser')
+    parser.add_argument('--chromium', help='Chromium executable (default: Playwright\'s)')
+    parser.add_argument('--json', help='Write the replay result to this file')
+    parser.add_argument('--baseline', help='Replay result of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed regression as a fraction (default: 0.2)')
+    args = parser.parse_args()
+    har_path = args.har or default_har_path(args.search_term)
+
+    if args.mode == 'record':
+        result = run_isolated(args.search_term, har_path, 'record', not args.headed, args.chromium)
+        print(f"Recorded {result['listings']} listings ({result['cards']} cards) to {har_path}")
+        return
+
+    if not os.path.exists(har_path):
+        sys.exit(f"No recording at {har_path}. Run: python {sys.argv[0]} record \"{args.search_term}\"")
+    runs = [run_isolated(args.search_term, har_path, 'replay', not args.headed, args.chromium) for _ in range(max(1, args.runs))]
+    result = sorted(runs, key=lambda run: run['seconds'])[len(runs) // 2]
+    print(json.dumps(result, indent=2))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = []
+        for metric, higher_is_better in GATED_METRICS.items():
+            base, value = baseline.get(metric), result.get(metric)
+            if not base or value is None:
+                continue
+            change = (value - base) / base
+            if (change < -args.tolerance) if higher_is_better else (change > args.tolerance):
+                regressions.append(f"{metric}: {base} -> {value} ({change:+.0%})")
+        if regressions:
+            print("Performance regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
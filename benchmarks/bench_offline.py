@@ -0,0 +1,304 @@
+"""
+Offline benchmark suite for the email crawler and validator.
+
+Serves a corpus of synthetic business sites from a local HTTP server and answers MX
+lookups from a local DNS stub, so every run is deterministic and needs no network.
+
+    python benchmarks/bench_offline.py                                  # http, extract and validate suites
+    python benchmarks/bench_offline.py --suites http,browser,tiered     # browser suites need Playwright
+    python benchmarks/bench_offline.py --json run.json                  # save results
+    python benchmarks/bench_offline.py --baseline run.json              # exit 1 on a regression
+
+Suites:
+    http      scrape_website_for_emails_http over every site
+    browser   the Playwright crawl (scrape_website_for_emails with http_first=False)
+    tiered    the production path: HTTP first, browser fallback
+    extract   extract_emails_from_text over every page of the corpus
+    validate  validate_csv_files on a generated results CSV, plus cold is_valid_email latency
+    cache     EmailCrawlCache.get_or_crawl from several threads, including many businesses on
+              shared hosts (facebook.com/<site>, sites.google.com/view/<site>); wrong_emails
+              counts lookups answered with another business's emails and must stay 0
+
+Each suite runs in a fresh process, so peak RSS is per suite. Caches are created in a
+temporary directory and the crawl cache is bypassed.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureServer, DNSStub, build_sites
+
+DEFAULT_SUITES = "http,extract,validate,cache"
+# Metrics where a higher value is better; every other gated metric is better when lower
+HIGHER_IS_BETTER = {"sites_per_second", "rows_per_second", "mb_per_second", "recall"}
+GATED_METRICS = {"sites_per_second", "rows_per_second", "mb_per_second", "recall", "p95_ms", "pages_per_site"}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def peak_rss_mb(include_children: bool = False) -> float:
+    """Peak resident set size of this process (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak += resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak * scale
+
+def _isolate(workdir: str, dns_port: int) -> None:
+    """Run from a scratch directory (all caches use relative paths) with DNS pointed at the stub."""
+    os.chdir(workdir)
+    import dns_cache
+    dns_cache.set_nameservers(["127.0.0.1"], dns_port)
+
+def _crawl_summary(sites: list[dict], latencies: list[float], pages: list[int], found: list[list[str]], seconds: float) -> dict:
+    expected = sum(len(site["emails"]) for site in sites)
+    hits = sum(len(set(site["emails"]) & set(emails)) for site, emails in zip(sites, found))
+    return {
+        "sites": len(sites),
+        "seconds": round(seconds, 3),
+        "sites_per_second": round(len(sites) / seconds, 2),
+        "pages_per_site": round(statistics.mean(pages), 2) if pages else 0,
+        "emails_found": sum(len(emails) for emails in found),
+        "recall": round(hits / expected, 3) if expected else 1.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+    }
+
+def run_crawl_suite(suite: str, base_url: str, sites: list[dict], workdir: str, dns_port: int, options: dict) -> dict:
+    _isolate(workdir, dns_port)
+    pool = None
+    if suite == "http":
+        from http_scrape_email import scrape_website_for_emails_http
+
+        def crawl(url, crawl_info):
+            emails, _ = scrape_website_for_emails_http(
+                url, max_depth=options["max_depth"], min_emails_required=options["min_emails"], crawl_info=crawl_info
+            )
+            return emails
+    else:
+        from browser_pool import BrowserPool
+        from scrape_email import _scrape_website_for_emails_uncached
+
+        class FixturePool(BrowserPool):
+            def _launch_browser(self, playwright):
+                return playwright.chromium.launch(headless=True, executable_path=options["chromium"])
+
+        pool = FixturePool(size=options["workers"])
+
+        def crawl(url, crawl_info):
+            return _scrape_website_for_emails_uncached(
+                url, True, options["max_depth"], 5, options["min_emails"], pool, suite == "tiered", crawl_info
+            ) or []
+
+    def timed(site):
+        crawl_info = {}
+        start = time.perf_counter()
+        emails = crawl(base_url + site["root"], crawl_info)
+        return time.perf_counter() - start, len(crawl_info.get("visited_urls", ())), emails
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            results = list(executor.map(timed, sites))
+    finally:
+        if pool is not None:
+            pool.close()
+    seconds = time.perf_counter() - start
+
+    summary = _crawl_summary(sites, [r[0] for r in results], [r[1] for r in results], [r[2] for r in results], seconds)
+    summary["peak_rss_mb"] = round(peak_rss_mb(include_children=pool is not None), 1)
+    return summary
+
+def run_extract_suite(pages: dict[str, str], repeat: int = 5) -> dict:
+    from email_extraction import extract_emails
+    corpus = list(pages.values())
+    megabytes = sum(len(page) for page in corpus) / 1e6
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in corpus:
+            page_start = time.perf_counter()
+            extract_emails(page)
+            latencies.append(time.perf_counter() - page_start)
+    seconds = time.perf_counter() - start
+    return {
+        "pages": len(corpus),
+        "seconds": round(seconds / repeat, 3),
+        "mb_per_second": round(megabytes * repeat / seconds, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def run_validate_suite(sites: list[dict], workdir: str, dns_port: int, rows: int) -> dict:
+    _isolate(workdir, dns_port)
+    from validate_emails import validate_csv_files, is_valid_email
+    from result_store import iter_rows
+
+    # Rows cycle through the site domains, so most domains are shared by several rows
+    domains = [site["domain"] for site in sites]
+    csv_filename = os.path.join(workdir, "bench_results.csv")
+    with open(csv_filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "email"])
+        for i in range(rows):
+            domain = domains[i % len(domains)]
+            writer.writerow([f"place-{i}", f"Hotel {i}", f"info@{domain},sales{i}@{domain},broken@@{domain}"])
+
+    start = time.perf_counter()
+    validate_csv_files([csv_filename])
+    seconds = time.perf_counter() - start
+    valid_rows = sum(1 for row in iter_rows(csv_filename) if row.get("valid_emails"))
+
+    # Cold single-email latency on domains the bulk pass has not cached yet
+    latencies = []
+    for site in sites:
+        email_start = time.perf_counter()
+        is_valid_email(f"owner@cold.{site['domain']}")
+        latencies.append(time.perf_counter() - email_start)
+
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1),
+        "rows_with_valid_emails": valid_rows,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def run_cache_suite(sites: list[dict], workdir: str, workers: int) -> dict:
+    os.chdir(workdir)
+    from email_cache import EmailCrawlCache
+
+    # Each business is reachable through its own domain and through pages on shared hosts
+    owners = {}
+    for site in sites:
+        slug = site["domain"].split(".")[0]
+        for url in (
+            f"https://{site['domain']}/", f"https://www.{site['domain']}/contact",
+            f"https://www.facebook.com/{slug}", f"https://facebook.com/{slug}/?fbclid=x",
+            f"https://sites.google.com/view/{slug}",
+        ):
+            owners[url] = f"owner@{site['domain']}"
+    cache = EmailCrawlCache(os.path.join(workdir, "bench_email_cache.db"))
+    crawls = []
+
+    def crawl(url):
+        crawls.append(url)
+        return [owners[url]], [url], 200
+
+    def lookup(url):
+        start = time.perf_counter()
+        emails, _ = cache.get_or_crawl(url, crawl)
+        return time.perf_counter() - start, emails == [owners[url]]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lookup, list(owners) * 2))
+    seconds = time.perf_counter() - start
+    cache.close()
+    latencies = [r[0] for r in results]
+    correct = sum(1 for r in results if r[1])
+    return {
+        "lookups": len(results),
+        "crawls": len(crawls),
+        "seconds": round(seconds, 3),
+        "wrong_emails": len(results) - correct,
+        "recall": round(correct / len(results), 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions beyond tolerance (a fraction) for every suite and gated metric both runs have."""
+    regressions = []
+    for suite, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(suite, {}).get(metric)
+            if metric not in GATED_METRICS or not base:
+                continue
+            change = (value - base) / base
+            if (metric in HIGHER_IS_BETTER and change < -tolerance) or (metric not in HIGHER_IS_BETTER and change > tolerance):
+                regressions.append(f"{suite}.{metric}: {base} -> {value} ({change:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default=DEFAULT_SUITES, help=f"Comma-separated suites (default: {DEFAULT_SUITES})")
+    parser.add_argument("--sites", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent site crawls, like EnrichmentPipeline's workers")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Artificial latency per HTTP request")
+    parser.add_argument("--dns-latency-ms", type=float, default=5, help="Artificial latency per DNS query")
+    parser.add_argument("--max-depth", type=int, default=1)
+    parser.add_argument("--min-emails", type=int, default=2, help="min_emails_required, as index.py uses it")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows in the validate suite's CSV")
+    parser.add_argument("--chromium", help="Chromium executable for the browser suites (default: Playwright's)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression as a fraction (default: 0.2)")
+    args = parser.parse_args()
+
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    pages, sites = build_sites(args.sites)
+    # Most site domains accept mail; every fifth has no MX record, every seventh does not exist
+    zone = {site["domain"]: i % 5 != 0 for i, site in enumerate(sites) if i % 7 != 0}
+    zone.update({f"cold.{domain}": has_mx for domain, has_mx in zone.items()})
+    options = {"workers": args.workers, "max_depth": args.max_depth, "min_emails": args.min_emails, "chromium": args.chromium}
+
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    with FixtureServer(pages, args.latency_ms) as server, DNSStub(zone, latency_ms=args.dns_latency_ms) as dns_stub:
+        for suite in suites:
+            with tempfile.TemporaryDirectory() as workdir, ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                requests_before, queries_before = server.requests, dns_stub.queries
+                if suite in ("http", "browser", "tiered"):
+                    future = executor.submit(run_crawl_suite, suite, server.base_url, sites, workdir, dns_stub.port, options)
+                elif suite == "extract":
+                    future = executor.submit(run_extract_suite, pages)
+                elif suite == "validate":
+                    future = executor.submit(run_validate_suite, sites, workdir, dns_stub.port, args.rows)
+                elif suite == "cache":
+                    future = executor.submit(run_cache_suite, sites, workdir, args.workers)
+                else:
+                    sys.exit(f"Unknown suite: {suite}")
+                results[suite] = future.result()
+                results[suite]["http_requests"] = server.requests - requests_before
+                results[suite]["dns_queries"] = dns_stub.queries - queries_before
+            print(f"{suite:>9}: " + "  ".join(f"{key}={value}" for key, value in results[suite].items()))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if results.get("cache", {}).get("wrong_emails"):
+        sys.exit(f"cache: {results['cache']['wrong_emails']} lookups returned another business's emails")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Performance regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Offline fixtures for the benchmarks: a corpus of synthetic business websites served from a
+local HTTP server, and a local DNS server answering MX queries from a fixed zone.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingUDPServer, BaseRequestHandler
+from threading import Thread
+import random
+import time
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+FILLER_WORDS = ["hotel", "room", "booking", "breakfast", "suite", "terrace", "view", "guest", "reception", "city", "centre", "stay"]
+FILLER_LINKS = ["rooms", "gallery", "offers", "location", "reviews", "blog/2023/summer", "blog/2022/winter", "faq", "events", "restaurant"]
+
+# How each site exposes its address, cycled over the corpus
+SITE_KINDS = ["contact_page", "homepage_mailto", "impressum_obfuscated", "cloudflare", "no_email", "js_rendered"]
+
+
+def cloudflare_encode(email: str, key: int = 0x5a) -> str:
+    return f"{key:02x}" + "".join(f"{ord(c) ^ key:02x}" for c in email)
+
+def _page(title: str, body: str, rng: random.Random, links: list[tuple[str, str]]) -> str:
+    nav = "".join(f'<a href="{href}">{text}</a> ' for href, text in links)
+    filler = "".join(f"<p>{' '.join(rng.choices(FILLER_WORDS, k=40))}</p>" for _ in range(rng.randint(5, 15)))
+    assets = "".join(f'<img src="/img/{i}.jpg" srcset="/img/{i}@2x.jpg 2x">' for i in range(rng.randint(5, 20)))
+    return (f"<!doctype html><html><head><title>{title}</title></head><body>"
+            f"<nav>{nav}</nav><main><h1>{title}</h1>{filler}{assets}{body}</main></body></html>")
+
+def build_sites(count: int, seed: int = 42) -> tuple[dict[str, str], list[dict]]:
+    """
+    Generates count sites under /site-<i>/.
+
+    Returns:
+        (pages, sites): pages maps a URL path to its HTML; sites lists each site's
+        root path, kind, email domain and the emails it exposes.
+    """
+    rng = random.Random(seed)
+    pages = {}
+    sites = []
+    for i in range(count):
+        kind = SITE_KINDS[i % len(SITE_KINDS)]
+        root = f"/site-{i}/"
+        domain = f"hotel{i}.test"
+        email = f"info@{domain}"
+        links = [(f"{root}{link}", link.split('/')[-1].title()) for link in rng.sample(FILLER_LINKS, k=rng.randint(4, len(FILLER_LINKS)))]
+        links += [(f"{root}privacy", "Privacy"), (f"{root}terms", "Terms"), (f"{root}about", "About us"),
+                  (f"{root}contact", "Contact"), (f"{root}impressum", "Impressum")]
+        rng.shuffle(links)
+
+        home_body, contact_body, impressum_body = "", "<p>Use the form below.</p><form></form>", "<p>Company details.</p>"
+        if kind == "contact_page":
+            contact_body = f"<p>Write to {email} or call us.</p>"
+        elif kind == "homepage_mailto":
+            home_body = f'<footer><a href="mailto:{email}?subject=Booking">Email us</a></footer>'
+        elif kind == "impressum_obfuscated":
+            impressum_body = f"<p>E-Mail: info [at] hotel{i} [dot] test</p>"
+        elif kind == "cloudflare":
+            contact_body = f'<a href="/cdn-cgi/l/email-protection#{cloudflare_encode(email)}">[email&#160;protected]</a>'
+
+        if kind == "js_rendered":
+            pages[root] = (f'<!doctype html><html><body><div id="root"></div><script>'
+                           f'document.getElementById("root").innerHTML = \'<p>Contact: <a href="mailto:{email}">{email}</a></p>\';'
+                           f'</script></body></html>')
+        else:
+            pages[root] = _page(f"Hotel {i}", home_body, rng, links)
+        pages[f"{root}contact"] = _page("Contact", contact_body, rng, links)
+        pages[f"{root}impressum"] = _page("Impressum", impressum_body, rng, links)
+        for path in ("privacy", "terms", "about"):
+            pages[f"{root}{path}"] = _page(path.title(), "", rng, links)
+        for href, _ in links:
+            pages.setdefault(href, _page("Page", "", rng, links))
+
+        sites.append({"root": root, "kind": kind, "domain": domain, "emails": [] if kind == "no_email" else [email]})
+    return pages, sites
+
+
+class FixtureServer:
+    """Serves the generated pages on 127.0.0.1 with an artificial per-request latency."""
+
+    def __init__(self, pages: dict[str, str], latency_ms: float = 20):
+        latency = latency_ms / 1000
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(latency)
+                body = pages.get(self.path.split('?')[0])
+                status = 200 if body is not None else 404
+                data = (body or "Not found").encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8" if body is not None else "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class DNSStub:
+    """
+    Answers MX queries over UDP from a fixed zone: {domain: True} gets an MX record,
+    {domain: False} gets an answer without one, anything else NXDOMAIN.
+    """
+
+    def __init__(self, zone: dict[str, bool], ttl: int = 3600, latency_ms: float = 5):
+        zone = {domain.lower().rstrip('.'): has_mx for domain, has_mx in zone.items()}
+        latency = latency_ms / 1000
+        self.queries = 0
+        stub = self
+
+        class Handler(BaseRequestHandler):
+            def handle(self):
+                data, sock = self.request
+                stub.queries += 1
+                time.sleep(latency)
+                query = dns.message.from_wire(data)
+                response = dns.message.make_response(query)
+                question = query.question[0]
+                name = question.name.to_text().lower().rstrip('.')
+                if name not in zone:
+                    response.set_rcode(dns.rcode.NXDOMAIN)
+                elif zone[name] and question.rdtype == dns.rdatatype.MX:
+                    response.answer.append(dns.rrset.from_text(question.name, ttl, "IN", "MX", f"10 mail.{name}."))
+                sock.sendto(response.to_wire(), self.client_address)
+
+        self.server = ThreadingUDPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def __enter__(self):
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,214 @@
+from playwright.sync_api import sync_playwright
+from concurrent.futures import Future
+from queue import Queue, Empty
+from threading import Thread, Lock
+from resource_blocking import apply_routing_profile
+import atexit
+
+# Defaults for the shared crawler pool
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MAX_PAGES_PER_CONTEXT = 50
+DEFAULT_ROUTING_PROFILE = 'crawler'   # See resource_blocking.ROUTING_PROFILES
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36"
+
+
+class BrowserPool:
+    """
+    A pool of long-lived Chromium browsers that hands out isolated contexts.
+
+    Playwright's sync API is bound to the thread that started it, so every browser
+    lives on its own worker thread and callers submit work to the pool instead of
+    touching the browser directly. Each task receives a BrowserContext which is
+    reused across tasks (cookies and pages are cleared in between) and recycled
+    once it has loaded `max_pages_per_context` pages. A browser that crashes or
+    disconnects is relaunched before the next task runs on it. If Playwright cannot
+    start on any worker, queued and later tasks fail with that error instead of hanging.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        max_pages_per_context: int = DEFAULT_MAX_PAGES_PER_CONTEXT,
+        headless: bool = True,
+        context_options: dict = None,
+        routing_profile=DEFAULT_ROUTING_PROFILE
+    ):
+        self.size = max(1, size)
+        self.max_pages_per_context = max_pages_per_context
+        self.headless = headless
+        self.context_options = context_options or {
+            "user_agent": DEFAULT_USER_AGENT,
+            "java_script_enabled": True
+        }
+        self.routing_profile = routing_profile
+        self._tasks = Queue()
+        self._threads = []
+        self._lock = Lock()
+        self._closed = False
+        self._live_workers = 0
+        self._startup_error = None  # Set once every worker failed to start Playwright
+
+    def _start_workers(self):
+        with self._lock:
+            if self._threads or self._closed:
+                return
+            self._live_workers = self.size
+            for i in range(self.size):
+                thread = Thread(target=self._worker, name=f"browser-pool-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _launch_browser(self, playwright):
+        return playwright.chromium.launch(headless=self.headless)
+
+    def _new_context(self, browser, slot):
+        context = browser.new_context(**self.context_options)
+        context.set_default_navigation_timeout(30000)
+        context.set_default_timeout(15000)
+        apply_routing_profile(context, self.routing_profile)
+        slot["pages_loaded"] = 0
+
+        def count_loads(page):
+            # Every main-frame DOMContentLoaded counts towards the recycle budget
+            page.on("domcontentloaded", lambda _: slot.__setitem__("pages_loaded", slot["pages_loaded"] + 1))
+
+        context.on("page", count_loads)
+        return context
+
+    def _close_quietly(self, target):
+        try:
+            if target is not None:
+                target.close()
+        except Exception:
+            pass
+
+    def _worker_failed(self, error: Exception) -> None:
+        """A worker could not start Playwright; once none are left, fail all queued work."""
+        print(f"[BrowserPool] Worker could not start Playwright: {error}")
+        with self._lock:
+            self._live_workers -= 1
+            if self._live_workers > 0:
+                return
+            self._startup_error = error
+        # submit() checks _startup_error under the lock, so nothing is queued after this drain
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except Empty:
+                return
+            if task is not None and task[0].set_running_or_notify_cancel():
+                task[0].set_exception(error)
+
+    def _worker(self):
+        slot = {"pages_loaded": 0}
+        browser = None
+        context = None
+        try:
+            p = sync_playwright().start()
+        except Exception as e:
+            self._worker_failed(e)
+            return
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                future, func, args, kwargs = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    # Crash replacement: relaunch if the browser died since the last task
+                    if browser is None or not browser.is_connected():
+                        if browser is not None:
+                            print("[BrowserPool] Browser disconnected. Launching a replacement.")
+                        self._close_quietly(browser)
+                        browser = self._launch_browser(p)
+                        context = None
+
+                    # Context recycling after N pages
+                    if context is not None and slot["pages_loaded"] >= self.max_pages_per_context:
+                        self._close_quietly(context)
+                        context = None
+                    if context is None:
+                        context = self._new_context(browser, slot)
+                except Exception as e:
+                    future.set_exception(e)
+                    browser, context = None, None
+                    continue
+
+                try:
+                    future.set_result(func(context, *args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    # Leave a clean context behind for the next borrower
+                    try:
+                        for page in list(context.pages):
+                            self._close_quietly(page)
+                        context.clear_cookies()
+                    except Exception:
+                        self._close_quietly(context)
+                        context = None
+
+            self._close_quietly(context)
+            self._close_quietly(browser)
+        finally:
+            p.stop()
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """Schedule func(context, *args, **kwargs) on a pooled browser and return a Future."""
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        self._start_workers()
+        future = Future()
+        with self._lock:
+            if self._startup_error is not None:
+                future.set_exception(self._startup_error)
+                return future
+            self._tasks.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Run func(context, *args, **kwargs) on a pooled browser and wait for its result."""
+        return self.submit(func, *args, **kwargs).result()
+
+    def close(self):
+        """Shut down every worker thread and the browsers they own."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._tasks.put(None)
+        for thread in threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_default_pool = None
+_default_pool_lock = Lock()
+
+def get_browser_pool(size: int = DEFAULT_POOL_SIZE, max_pages_per_context: int = DEFAULT_MAX_PAGES_PER_CONTEXT) -> BrowserPool:
+    """Return the process-wide crawler pool, creating it on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None or _default_pool._closed:
+            _default_pool = BrowserPool(size=size, max_pages_per_context=max_pages_per_context)
+        return _default_pool
+
+def close_browser_pool():
+    """Close the process-wide crawler pool if it was started."""
+    global _default_pool
+    with _default_pool_lock:
+        pool, _default_pool = _default_pool, None
+    if pool is not None:
+        pool.close()
+
+atexit.register(close_browser_pool)
@@ -0,0 +1,72 @@
+from typing import Optional
+
+# Known cookie/consent banners, tried in order. container is a CSS selector for the banner,
+# button the selector (searched inside the container) of the control that accepts it.
+# An optional text list restricts button to those whose label starts with one of the
+# phrases, most preferred first. Append rules here to support more consent platforms.
+CONSENT_RULES = [
+    {'name': 'onetrust', 'container': '#onetrust-banner-sdk, #onetrust-consent-sdk', 'button': '#onetrust-accept-btn-handler'},
+    {'name': 'cookiebot', 'container': '#CybotCookiebotDialog',
+     'button': '#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll, #CybotCookiebotDialogBodyButtonAccept'},
+    {'name': 'didomi', 'container': '#didomi-host, #didomi-popup', 'button': '#didomi-notice-agree-button'},
+    {'name': 'quantcast', 'container': '.qc-cmp2-container', 'button': '.qc-cmp2-summary-buttons button[mode="primary"]'},
+    {'name': 'cookieyes', 'container': '.cky-consent-container', 'button': '.cky-btn-accept'},
+    {'name': 'complianz', 'container': '.cmplz-cookiebanner', 'button': '.cmplz-accept'},
+    {'name': 'cookie-notice', 'container': '#cookie-notice', 'button': '#cn-accept-cookie'},
+    {'name': 'iubenda', 'container': '#iubenda-cs-banner', 'button': '.iubenda-cs-accept-btn'},
+    {'name': 'borlabs', 'container': '#BorlabsCookieBox', 'button': '[data-cookie-accept-all], [data-cookie-accept]'},
+    {'name': 'generic',
+     'container': '[id*="cookie" i], [class*="cookie" i], [id*="consent" i], [class*="consent" i], [aria-modal="true"], [role="dialog"]',
+     'button': 'button, a[role="button"], [role="button"], input[type="button"], input[type="submit"]',
+     'text': ['accept all', 'allow all', 'alle akzeptieren', 'accetta tutti', 'accepter tout', 'aceptar todo',
+              'accept', 'agree', 'i agree', 'allow', 'akzeptieren', 'accetta', 'accepter', 'aceptar', 'got it', 'ok', 'confirm']},
+]
+
+# Runs entirely in the page: one round-trip whether or not there is a banner
+DISMISS_SCRIPT = """
+(rules) => {
+    const visible = (el) => {
+        const style = getComputedStyle(el);
+        if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') return false;
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    const label = (el) => (el.innerText || el.value || el.getAttribute('aria-label') || '').trim().toLowerCase();
+    for (const rule of rules) {
+        const containers = Array.from(document.querySelectorAll(rule.container)).filter(visible);
+        if (!containers.length) continue;
+        const buttons = containers.flatMap((c) => Array.from(c.querySelectorAll(rule.button))).filter(visible);
+        if (!rule.text) {
+            if (buttons.length) { buttons[0].click(); return rule.name; }
+            continue;
+        }
+        for (const phrase of rule.text) {
+            const button = buttons.find((b) => { const text = label(b); return text === phrase || text.startsWith(phrase + ' '); });
+            if (button) { button.click(); return rule.name; }
+        }
+    }
+    return null;
+}
+"""
+
+
+def dismiss_consent_banner(page, rules: list[dict] = None) -> Optional[str]:
+    """
+    Accepts the first known cookie/consent banner on a sync Playwright page in a single evaluate call.
+
+    Returns:
+        The name of the rule that matched, or None if there was no banner (or it could not be handled).
+    """
+    try:
+        return page.evaluate(DISMISS_SCRIPT, CONSENT_RULES if rules is None else rules)
+    except Exception as e:
+        print(f"Minor error dismissing consent banner on {page.url}: {e}")
+        return None
+
+async def dismiss_consent_banner_async(page, rules: list[dict] = None) -> Optional[str]:
+    """Async counterpart of dismiss_consent_banner."""
+    try:
+        return await page.evaluate(DISMISS_SCRIPT, CONSENT_RULES if rules is None else rules)
+    except Exception as e:
+        print(f"Minor error dismissing consent banner on {page.url}: {e}")
+        return None
@@ -0,0 +1,123 @@
+from urllib.parse import urljoin, urlparse
+import heapq
+import itertools
+
+# Keywords that mark a link as a likely contact/about page
+CONTACT_KEYWORDS = ["contact", "about", "email", "mail", "impressum", "legal", "privacy", "terms", "support", "kontakt", "ueberuns", "team"]
+
+# How promising a link is for finding an email address, per keyword in CONTACT_KEYWORDS.
+# Keywords missing here score DEFAULT_KEYWORD_WEIGHT.
+KEYWORD_WEIGHTS = {
+    "contact": 10, "kontakt": 10,
+    "email": 8, "mail": 7, "impressum": 8,
+    "about": 5, "ueberuns": 5, "team": 4, "support": 4,
+    "legal": 3,
+    "privacy": 1, "terms": 1
+}
+DEFAULT_KEYWORD_WEIGHT = 2
+ANCHOR_TEXT_BONUS = 1.5     # The keyword is in the visible link text ("Contact us"), not just the URL
+BOTH_MATCH_BONUS = 2        # ...and in the URL as well
+PATH_DEPTH_PENALTY = 1      # Per path segment beyond the first: /contact beats /blog/2021/contact
+QUERY_PENALTY = 2           # Links with a query string are rarely the canonical contact page
+CRAWL_DEPTH_PENALTY = 3     # Per crawl level, so a good link on the homepage beats a similar one found deeper
+
+HOMEPAGE_SCORE = float("inf")
+
+
+def _keyword_weight(haystack: str, keywords: list[str]) -> float:
+    return max((KEYWORD_WEIGHTS.get(keyword, DEFAULT_KEYWORD_WEIGHT) for keyword in keywords if keyword in haystack), default=0)
+
+def score_link(path: str, query: str, anchor_text: str, keywords: list[str]) -> float:
+    """
+    Scores an internal link by how likely it is to lead to an email address.
+
+    Args:
+        path: The lowercased URL path.
+        query: The lowercased URL query string.
+        anchor_text: The lowercased link text.
+        keywords: The keywords that make a link relevant.
+
+    Returns:
+        0 if no keyword matches, otherwise a positive score (higher is better).
+    """
+    url_weight = _keyword_weight(path + "?" + query, keywords)
+    text_weight = _keyword_weight(anchor_text, keywords)
+    if not url_weight and not text_weight:
+        return 0
+    score = max(url_weight, text_weight * ANCHOR_TEXT_BONUS)
+    if url_weight and text_weight:
+        score += BOTH_MATCH_BONUS
+    segments = [segment for segment in path.split("/") if segment]
+    score -= PATH_DEPTH_PENALTY * max(0, len(segments) - 1)
+    if query:
+        score -= QUERY_PENALTY
+    return max(score, 0.1)
+
+
+def rank_relevant_links(anchors: list[tuple[str, str]], base_url: str, keywords: list[str]) -> list[tuple[float, str]]:
+    """
+    Scores (href, text) anchor pairs that are internal HTTP/HTTPS links whose text or href contains a keyword.
+
+    Returns:
+        (score, url) pairs, best first. See score_link.
+    """
+    scores = {}
+    parsed_base_url = urlparse(base_url)
+
+    for href, text in anchors:
+        text = (text or "").lower()
+        if not href or href.startswith(("javascript:", "#", "tel:", "data:")):
+            continue
+
+        full_url = urljoin(base_url, href)
+        parsed_full_url = urlparse(full_url)
+
+        if parsed_full_url.scheme not in ['http', 'https'] or not parsed_full_url.netloc.endswith(parsed_base_url.netloc):
+            continue
+
+        score = score_link(parsed_full_url.path.lower(), parsed_full_url.query.lower(), text, keywords)
+        if score > scores.get(full_url, 0):
+            scores[full_url] = score
+    return sorted(((score, url) for url, score in scores.items()), key=lambda pair: -pair[0])
+
+
+class CrawlFrontier:
+    """
+    Priority queue of URLs still to visit on one site, best candidate first.
+
+    Every URL is accepted at most once, so a URL that was already queued or visited is
+    never added again. Ties keep insertion order.
+    """
+
+    def __init__(self, initial_url: str = None):
+        self._heap = []
+        self._counter = itertools.count()
+        self.seen = set()
+        if initial_url:
+            self.push(initial_url, 0, HOMEPAGE_SCORE)
+
+    def push(self, url: str, depth: int, score: float) -> bool:
+        """Queues url found at the given crawl depth. Returns False if it was seen before."""
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        heapq.heappush(self._heap, (-(score - CRAWL_DEPTH_PENALTY * depth), next(self._counter), url, depth))
+        return True
+
+    def add_links(self, ranked_links: list[tuple[float, str]], depth: int, limit: int) -> int:
+        """Queues up to limit new links from (score, url) pairs sorted best first. Returns the number added."""
+        added = 0
+        for score, url in ranked_links:
+            if added >= limit:
+                break
+            if self.push(url, depth, score):
+                added += 1
+        return added
+
+    def pop(self) -> tuple[str, int]:
+        """The most promising (url, depth) still queued."""
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def __len__(self) -> int:
+        return len(self._heap)
@@ -0,0 +1,124 @@
+from threading import Lock
+from typing import Optional
+import struct
+import mmap
+import os
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'disposable_domain_list.txt')
+INDEX_PATH = SOURCE_PATH[:-len('.txt')] + '.bin'
+
+# Index layout: MAGIC, uint32 count, (count + 1) uint32 offsets, then the sorted domains back to back
+MAGIC = b'DDL1'
+HEADER = struct.Struct('<4sI')
+OFFSET = struct.Struct('<I')
+
+
+def build_index(source_path: str = SOURCE_PATH) -> bytes:
+    """Compiles the text list into the sorted binary layout."""
+    with open(source_path, 'r', encoding='utf-8') as f:
+        domains = sorted({line.strip().lower().encode('utf-8') for line in f if line.strip()})
+    offsets = [0]
+    for domain in domains:
+        offsets.append(offsets[-1] + len(domain))
+    return b''.join([
+        HEADER.pack(MAGIC, len(domains)),
+        struct.pack(f'<{len(offsets)}I', *offsets),
+        *domains
+    ])
+
+def _index_is_stale(source_path: str, index_path: str) -> bool:
+    if not os.path.exists(index_path):
+        return True
+    if not os.path.exists(source_path):
+        return False  # Only the compiled index was shipped; use it as is
+    return os.path.getmtime(index_path) < os.path.getmtime(source_path)
+
+def _write_index(data: bytes, index_path: str) -> None:
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, index_path)
+
+
+class DisposableDomainIndex:
+    """
+    Sorted, memory-mapped set of disposable domains with parent-domain (suffix) matching.
+
+    Lookups binary-search the mapped file directly, so the list never becomes a Python set.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        magic, self.count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a disposable domain index")
+        self._offsets_start = HEADER.size
+        self._data_start = self._offsets_start + (self.count + 1) * OFFSET.size
+
+    @classmethod
+    def load(cls, source_path: str = SOURCE_PATH, index_path: str = INDEX_PATH) -> 'DisposableDomainIndex':
+        """Maps the compiled index, (re)building it first if the text list is newer."""
+        if _index_is_stale(source_path, index_path):
+            data = build_index(source_path)
+            try:
+                _write_index(data, index_path)
+            except OSError as e:
+                # Read-only checkout: keep the compiled index in memory for this process
+                print(f"Could not write {index_path}: {e}")
+                return cls(data)
+        with open(index_path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def empty(cls) -> 'DisposableDomainIndex':
+        return cls(HEADER.pack(MAGIC, 0) + OFFSET.pack(0))
+
+    def _domain_at(self, i: int) -> bytes:
+        start = OFFSET.unpack_from(self._buffer, self._offsets_start + i * OFFSET.size)[0]
+        end = OFFSET.unpack_from(self._buffer, self._offsets_start + (i + 1) * OFFSET.size)[0]
+        return self._buffer[self._data_start + start:self._data_start + end]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, domain: str) -> bool:
+        target = domain.lower().encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._domain_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self.count and self._domain_at(lo) == target
+
+    def match(self, domain: str) -> Optional[str]:
+        """The listed domain that domain equals or is a subdomain of, or None."""
+        labels = domain.lower().strip('.').split('.')
+        # Stop before the bare TLD; "mail.foo.tempmail.com" checks itself, foo.tempmail.com, tempmail.com
+        for i in range(len(labels) - 1):
+            candidate = '.'.join(labels[i:])
+            if candidate in self:
+                return candidate
+        return None
+
+
+_index = None
+_index_lock = Lock()
+
+def get_disposable_index() -> DisposableDomainIndex:
+    """Loads the index on first use, so importing this module costs nothing."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = DisposableDomainIndex.load()
+                except Exception as e:
+                    # Validation keeps working, just without the disposable-domain check
+                    print(f"Warning: could not load the disposable domain list ({e}); no domains will be treated as disposable")
+                    _index = DisposableDomainIndex.empty()
+    return _index
+
+def is_disposable(domain: str) -> bool:
+    return get_disposable_index().match(domain) is not None
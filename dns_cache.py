@@ -0,0 +1,144 @@
+import dns.resolver
+import dns.rdatatype
+from threading import Lock
+from typing import Optional
+from sqlite_store import open_sqlite, evict_lru
+import time
+
+DNS_CACHE_DB_PATH = 'dns_cache.db'
+MIN_TTL_SECONDS = 300               # Floor for very short DNS TTLs
+MAX_TTL_SECONDS = 7 * 24 * 3600     # Ceiling so stale answers are eventually refreshed
+DEFAULT_NEGATIVE_TTL_SECONDS = 3600 # When the response carries no SOA to take the negative TTL from
+TRANSIENT_NEGATIVE_TTL_SECONDS = 300 # SERVFAIL / no nameserver answered: remembered in memory only
+MAX_ENTRIES = 200000                # Least recently used domains are evicted beyond this
+EVICTION_CHECK_INTERVAL = 1000
+
+NAMESERVERS = ['8.8.8.8', '8.8.4.4', '1.1.1.1', '1.0.0.1'] # Google and Cloudflare DNS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mx_cache (
+    domain TEXT PRIMARY KEY,
+    has_mx INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mx_cache_last_access ON mx_cache (last_access);
+"""
+
+
+def clamp_ttl(ttl) -> float:
+    try:
+        ttl = float(ttl)
+    except (TypeError, ValueError):
+        return DEFAULT_NEGATIVE_TTL_SECONDS
+    return max(MIN_TTL_SECONDS, min(MAX_TTL_SECONDS, ttl))
+
+def answer_ttl(answer) -> float:
+    """TTL of a positive MX answer."""
+    try:
+        return clamp_ttl(answer.rrset.ttl)
+    except AttributeError:
+        return clamp_ttl(None)
+
+def negative_ttl(exc) -> float:
+    """Negative-caching TTL (RFC 2308): the SOA minimum from the authority section, if present."""
+    responses = []
+    try:
+        if isinstance(exc, dns.resolver.NXDOMAIN):
+            responses = list(exc.responses().values())
+        elif isinstance(exc, dns.resolver.NoAnswer):
+            responses = [exc.response()]
+    except Exception:
+        responses = []
+    for response in responses:
+        for rrset in getattr(response, 'authority', []):
+            if rrset.rdtype == dns.rdatatype.SOA and len(rrset):
+                return clamp_ttl(min(rrset.ttl, rrset[0].minimum))
+    return DEFAULT_NEGATIVE_TTL_SECONDS
+
+
+class MXRecordCache:
+    """
+    Persistent MX verdict cache shared by every thread and process, stored in SQLite (WAL).
+
+    Entries expire according to the DNS answer's own TTL (clamped), and the table is
+    bounded by evicting the least recently used domains. Transient failures are kept
+    apart, in this process's memory for a few minutes, and never written to disk.
+    """
+
+    def __init__(self, path: str = DNS_CACHE_DB_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = Lock()
+        self._transient = {}    # domain -> expires_at of a transient failure
+        self._conn = open_sqlite(path, SCHEMA)
+
+    def get(self, domain: str) -> Optional[bool]:
+        """The cached verdict, or None if the domain is unknown or its TTL has passed."""
+        domain = domain.lower()
+        now = time.time()
+        with self._lock:
+            expires_at = self._transient.get(domain)
+            if expires_at is not None:
+                if expires_at >= now:
+                    return False
+                del self._transient[domain]
+            row = self._conn.execute("SELECT has_mx, expires_at FROM mx_cache WHERE domain = ?", (domain,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM mx_cache WHERE domain = ?", (domain,))
+                return None
+            self._conn.execute("UPDATE mx_cache SET last_access = ? WHERE domain = ?", (now, domain))
+        return bool(row[0])
+
+    def put(self, domain: str, has_mx: bool, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mx_cache (domain, has_mx, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (domain.lower(), int(has_mx), now + ttl, now)
+            )
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_INTERVAL == 0:
+                evict_lru(self._conn, 'mx_cache', self.max_entries)
+
+    def put_transient_failure(self, domain: str, ttl: float = TRANSIENT_NEGATIVE_TTL_SECONDS) -> None:
+        """Remember a lookup that failed for a possibly temporary reason, in memory only."""
+        with self._lock:
+            self._transient[domain.lower()] = time.time() + ttl
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_resolver = None
+_cache = None
+_init_lock = Lock()
+
+def get_resolver() -> dns.resolver.Resolver:
+    """One resolver per process instead of a new one per lookup. dnspython resolvers are thread-safe."""
+    global _resolver
+    with _init_lock:
+        if _resolver is None:
+            _resolver = dns.resolver.Resolver()
+            _resolver.nameservers = list(NAMESERVERS)
+            _resolver.lifetime = 3  # Set timeout to 3 seconds for each query
+            _resolver.timeout = 1   # Set timeout for each individual server query to 1 second
+        return _resolver
+
+def set_nameservers(nameservers: list[str], port: int = 53) -> None:
+    """Points the shared resolver at other nameservers, e.g. a local stub for offline benchmarks."""
+    resolver = get_resolver()
+    with _init_lock:
+        resolver.nameservers = list(nameservers)
+        resolver.port = port
+
+def get_mx_cache() -> MXRecordCache:
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            _cache = MXRecordCache()
+        return _cache
@@ -0,0 +1,188 @@
+from place_index import normalize_domain
+from sqlite_store import open_sqlite, evict_lru
+from threading import Lock, Event
+from urllib.parse import urlparse, parse_qsl, urlencode
+from typing import Optional
+import json
+import time
+
+EMAIL_CACHE_DB_PATH = 'email_cache.db'
+POSITIVE_TTL_SECONDS = 30 * 24 * 3600   # Domains where we found emails
+NEGATIVE_TTL_SECONDS = 3 * 24 * 3600    # Domains where we found none (or the site was down)
+MAX_ENTRIES = 100000                    # Least recently used domains are evicted beyond this
+EVICTION_CHECK_INTERVAL = 500           # Check the size bound every N writes
+
+# Social networks, site builders and directories that host many unrelated businesses under
+# one domain (facebook.com/hotelA, sites.google.com/view/hotelB). Subdomains match too.
+SHARED_HOSTS = frozenset({
+    'facebook.com', 'instagram.com', 'twitter.com', 'x.com', 'linkedin.com', 'tiktok.com', 'youtube.com',
+    'linktr.ee', 'sites.google.com', 'google.com', 'g.page', 'business.site', 'wixsite.com', 'wordpress.com',
+    'blogspot.com', 'weebly.com', 'jimdosite.com', 'webnode.it', 'webnode.com', 'squarespace.com',
+    'booking.com', 'tripadvisor.com', 'tripadvisor.it', 'yelp.com', 'paginegialle.it', 'miodottore.it',
+})
+# Query parameters that never identify a page
+TRACKING_QUERY_PARAMS = {'fbclid', 'gclid', 'ref', 'igshid'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_cache (
+    domain TEXT PRIMARY KEY,    -- cache_key(): the domain, or host + path on shared hosts
+    emails TEXT NOT NULL,
+    visited_urls TEXT NOT NULL,
+    http_status INTEGER,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS crawl_cache_last_access ON crawl_cache (last_access);
+"""
+
+
+def _is_shared_host(domain: str) -> bool:
+    parts = domain.split('.')
+    return any('.'.join(parts[i:]) in SHARED_HOSTS for i in range(len(parts) - 1))
+
+def cache_key(url: str) -> Optional[str]:
+    """
+    The crawl cache key for a website: its normalized domain, or host + path + query on SHARED_HOSTS.
+
+    'https://www.example.com/contact' -> 'example.com'
+    'https://www.facebook.com/hotelA/' -> 'facebook.com/hotela'
+    """
+    domain = normalize_domain(url)
+    if not domain or not _is_shared_host(domain):
+        return domain
+    parsed = urlparse(url if '://' in url else 'https://' + url)
+    key = domain + parsed.path.rstrip('/').lower()
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parsed.query)
+        if name not in TRACKING_QUERY_PARAMS and not name.startswith('utm_')
+    )
+    return key + '?' + urlencode(query) if query else key
+
+
+class EmailCrawlCache:
+    """
+    Disk-backed cache of email crawl results keyed by cache_key: the normalized website
+    domain, or the page itself on platforms shared by many businesses.
+
+    This is the only per-domain email store: every place on an already crawled domain is
+    answered from here. Entries with emails live for positive_ttl, empty results for
+    negative_ttl, so dead or email-less sites are retried eventually. The cache is bounded
+    to max_entries by evicting the least recently used domains.
+    """
+
+    def __init__(
+        self,
+        path: str = EMAIL_CACHE_DB_PATH,
+        positive_ttl: float = POSITIVE_TTL_SECONDS,
+        negative_ttl: float = NEGATIVE_TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES
+    ):
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = Lock()
+        self._inflight = {}         # cache key -> Event set when its crawl finishes
+        self._inflight_lock = Lock()
+        self._conn = open_sqlite(path, SCHEMA)
+
+    def get(self, url: str) -> Optional[dict]:
+        """The cached crawl for the URL's cache_key, or None if missing or expired."""
+        domain = cache_key(url)
+        if not domain:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT emails, visited_urls, http_status, fetched_at FROM crawl_cache WHERE domain = ?", (domain,)
+            ).fetchone()
+            if row is None:
+                return None
+            emails = json.loads(row[0])
+            ttl = self.positive_ttl if emails else self.negative_ttl
+            if now - row[3] > ttl:
+                self._conn.execute("DELETE FROM crawl_cache WHERE domain = ?", (domain,))
+                return None
+            self._conn.execute("UPDATE crawl_cache SET last_access = ? WHERE domain = ?", (now, domain))
+        return {
+            "domain": domain,
+            "emails": emails,
+            "visited_urls": json.loads(row[1]),
+            "http_status": row[2],
+            "fetched_at": row[3]
+        }
+
+    def put(self, url: str, emails: list[str], visited_urls: list[str] = None, http_status: int = None) -> None:
+        domain = cache_key(url)
+        if not domain:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crawl_cache (domain, emails, visited_urls, http_status, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (domain, json.dumps(sorted(emails)), json.dumps(list(visited_urls or [])), http_status, now, now)
+            )
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_INTERVAL == 0:
+                evict_lru(self._conn, 'crawl_cache', self.max_entries)
+
+    def get_or_crawl(self, url: str, crawl) -> tuple[Optional[list[str]], bool]:
+        """
+        The cached emails for the URL's cache_key, crawling it on a miss.
+
+        crawl(url) returns (emails, visited_urls, http_status), or None if the crawl failed;
+        successful crawls are stored. Threads asking for a key that is already being
+        crawled in this process wait for that crawl instead of starting their own.
+
+        Returns:
+            An (emails, from_cache) tuple. emails is None if the crawl failed.
+        """
+        domain = cache_key(url)
+        if not domain:
+            result = crawl(url)
+            return (result[0] if result else None), False
+
+        cached = self.get(url)
+        if cached is not None:
+            return cached['emails'], True
+        with self._inflight_lock:
+            event = self._inflight.get(domain)
+            owner = event is None
+            if owner:
+                event = self._inflight[domain] = Event()
+        if not owner:
+            event.wait()
+            cached = self.get(url)
+            if cached is not None:
+                return cached['emails'], True
+            # The other crawl failed; try once ourselves without blocking anyone else
+
+        try:
+            result = crawl(url)
+            if result is not None:
+                emails, visited_urls, http_status = result
+                self.put(url, emails, visited_urls, http_status)
+        finally:
+            if owner:
+                with self._inflight_lock:
+                    self._inflight.pop(domain, None)
+                event.set()
+        return (result[0] if result else None), False
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = Lock()
+
+def get_email_cache() -> EmailCrawlCache:
+    """Return this process's connection to the shared crawl cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmailCrawlCache()
+        return _default_cache
@@ -0,0 +1,111 @@
+import html
+import re
+from typing import Optional
+
+# Characters allowed in the local part (before the @); matches the legacy EMAIL_REGEX
+LOCAL_PART_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+MAX_LOCAL_PART_LENGTH = 64
+
+# Domain right after an @: dot-separated labels ending in an alphabetic TLD
+DOMAIN_PATTERN = re.compile(r"[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,24}(?![a-z0-9-])", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"[a-z0-9._%+-]{1,64}@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,24}", re.IGNORECASE)
+
+# Things that look like addresses but are file names, e.g. logo@2x.png or lodash@4.17.21.min.js
+ASSET_EXTENSIONS = frozenset({
+    "png", "jpg", "jpeg", "gif", "svg", "webp", "avif", "ico", "bmp", "tif", "tiff", "heic",
+    "css", "scss", "js", "mjs", "cjs", "ts", "map", "json", "xml", "txt",
+    "woff", "woff2", "ttf", "otf", "eot",
+    "mp3", "mp4", "webm", "mov", "avi", "wav", "ogg", "pdf", "zip", "gz"
+})
+
+# Obfuscations decoded before matching
+ENTITY_AT = re.compile(r"&#0*64;|&#x0*40;|&commat;", re.IGNORECASE)
+OBFUSCATED_AT = re.compile(r"[\[\(\{]\s*(?:at|@)\s*[\]\)\}]", re.IGNORECASE)
+OBFUSCATED_DOT = re.compile(r"[\[\(\{]\s*(?:dot|\.)\s*[\]\)\}]", re.IGNORECASE)
+CLOUDFLARE_EMAIL = re.compile(r"(?:data-cfemail=[\"']|/cdn-cgi/l/email-protection#)([0-9a-f]{6,})", re.IGNORECASE)
+LEADING_ESCAPE = re.compile(r"^(?:%[0-9a-f]{2}|u00[0-9a-f]{2})+", re.IGNORECASE)
+
+
+def decode_cloudflare_email(encoded: str) -> str:
+    """Decodes Cloudflare's email-protection hex: the first byte is an XOR key for the rest."""
+    try:
+        key = int(encoded[:2], 16)
+        return "".join(chr(int(encoded[i:i + 2], 16) ^ key) for i in range(2, len(encoded) - 1, 2))
+    except ValueError:
+        return ""
+
+def is_asset_filename(email: str) -> bool:
+    return email.rsplit(".", 1)[-1].lower() in ASSET_EXTENSIONS
+
+def _replace_spelled_out(text: str, pattern: re.Pattern, replacement: str) -> str:
+    """
+    Replaces " [at] " style spellings together with their surrounding whitespace.
+
+    Equivalent to re.sub(r"\s*" + pattern + r"\s*", ...) but several times faster, since a
+    pattern with a leading \s* has to be attempted at every offset of the page.
+    """
+    pieces = []
+    last = 0
+    for match in pattern.finditer(text):
+        pieces.append(text[last:match.start()].rstrip())
+        pieces.append(replacement)
+        last = match.end()
+        while last < len(text) and text[last].isspace():
+            last += 1
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+def deobfuscate(text: str) -> str:
+    """Undoes entity-encoded @ signs and [at]/[dot] spellings. Each pass only runs when its marker is present."""
+    if "&" in text and ENTITY_AT.search(text):
+        text = html.unescape(text)
+    if OBFUSCATED_AT.search(text):
+        text = _replace_spelled_out(text, OBFUSCATED_AT, "@")
+        text = _replace_spelled_out(text, OBFUSCATED_DOT, ".")
+    return text
+
+def _scan(text: str, found: set[str]) -> None:
+    """Finds addresses by jumping from @ to @ instead of letting the regex try every offset."""
+    at = text.find("@")
+    while at != -1:
+        domain_match = DOMAIN_PATTERN.match(text, at + 1)
+        if domain_match:
+            start = at
+            lower_bound = max(0, at - MAX_LOCAL_PART_LENGTH)
+            while start > lower_bound and text[start - 1] in LOCAL_PART_CHARS:
+                start -= 1
+            local = LEADING_ESCAPE.sub("", text[start:at]).strip(".")
+            domain = domain_match.group(0).lower()
+            if local and not is_asset_filename(domain):
+                found.add(f"{local.lower()}@{domain}")
+        at = text.find("@", at + 1)
+
+def extract_emails(text: str) -> set[str]:
+    """
+    Extracts lowercased email addresses from raw page HTML or text.
+
+    Decodes Cloudflare-protected addresses, HTML-entity @ signs and "name [at] domain [dot] com"
+    spellings, and drops asset file names such as image@2x.png.
+    """
+    if not text:
+        return set()
+    found = set()
+    if "cfemail" in text or "email-protection" in text:
+        for encoded in CLOUDFLARE_EMAIL.findall(text):
+            email = decode_cloudflare_email(encoded)
+            if EMAIL_PATTERN.fullmatch(email) and not is_asset_filename(email):
+                found.add(email.lower())
+    _scan(deobfuscate(text), found)
+    return found
+
+def parse_mailto(href: str) -> Optional[str]:
+    """Returns the lowercased address of a mailto: (any case) href, or None if it is not a valid email."""
+    if not href:
+        return None
+    email = href.strip()
+    if email[:7].lower() == "mailto:":
+        email = email[7:]
+    email = email.split("?")[0].strip()
+    if EMAIL_PATTERN.fullmatch(email) and not is_asset_filename(email):
+        return email.lower()
+    return None
@@ -0,0 +1,194 @@
+from email_extraction import extract_emails, parse_mailto
+from crawl_frontier import CrawlFrontier, rank_relevant_links, CONTACT_KEYWORDS
+from browser_pool import DEFAULT_USER_AGENT
+from html.parser import HTMLParser
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+import requests
+import codecs
+import re
+
+HTTP_TIMEOUT_SECONDS = 10
+MAX_HTML_BYTES = 2 * 1024 * 1024   # Don't pull more than 2 MB of HTML per page
+MIN_VISIBLE_TEXT_CHARS = 200       # Less visible text than this suggests a JS-rendered page
+META_CHARSET_SCAN_BYTES = 4096     # Browsers look for <meta charset> in the first bytes of the document
+
+CHARSET_PATTERN = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+# Markers left behind by client-side rendered apps in their initial HTML
+JS_APP_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>'
+    r'|enable javascript|javascript is required|you need to enable javascript',
+    re.IGNORECASE
+)
+
+
+def _build_session() -> requests.Session:
+    """One keep-alive session shared by all threads, with a connection pool per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=100, pool_maxsize=16, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'User-Agent': DEFAULT_USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive'
+    })
+    return session
+
+SESSION = _build_session()
+
+
+class _PageParser(HTMLParser):
+    """Collects anchors, mailto targets and visible text from raw HTML in one pass."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.anchors = []
+        self.mailtos = []
+        self.text_chars = 0
+        self._skip_depth = 0
+        self._current_href = None
+        self._current_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style', 'noscript', 'template'):
+            self._skip_depth += 1
+        elif tag == 'a':
+            href = dict(attrs).get('href')
+            if href and href.lower().startswith('mailto:'):
+                self.mailtos.append(href)
+            self._current_href = href
+            self._current_text = []
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style', 'noscript', 'template'):
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'a' and self._current_href is not None:
+            self.anchors.append((self._current_href, ''.join(self._current_text).strip()))
+            self._current_href = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self.text_chars += len(data.strip())
+        if self._current_href is not None:
+            self._current_text.append(data)
+
+
+def _html_encoding(content_type: str, body: bytes) -> str:
+    """
+    The page's charset from the Content-Type header or a <meta> tag, else UTF-8.
+
+    requests assumes ISO-8859-1 for text/html without a charset, which mangles non-ASCII
+    addresses and link text on the many sites that send UTF-8 without declaring it.
+    """
+    match = CHARSET_PATTERN.search(content_type) or META_CHARSET_PATTERN.search(body[:META_CHARSET_SCAN_BYTES])
+    if match:
+        charset = match.group(1)
+        charset = charset.decode('ascii', 'ignore') if isinstance(charset, bytes) else charset
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+def fetch_html(url: str, timeout: int = HTTP_TIMEOUT_SECONDS):
+    """
+    Fetches a page over plain HTTP.
+
+    Returns:
+        A (status_code, final_url, html) tuple. html is None for non-HTML or failed responses.
+    """
+    try:
+        with SESSION.get(url, timeout=timeout, stream=True, allow_redirects=True) as response:
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code >= 400 or 'html' not in content_type.lower():
+                return response.status_code, response.url, None
+            body = b''
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body += chunk
+                if len(body) >= MAX_HTML_BYTES:
+                    break
+            return response.status_code, response.url, body.decode(_html_encoding(content_type, body), errors='replace')
+    except requests.RequestException as e:
+        print(f"HTTP fetch failed for {url}: {e}")
+        return None, url, None
+
+def looks_js_rendered(html: str, visible_text_chars: int) -> bool:
+    """Heuristic: the page is an empty shell that needs a browser to render its content."""
+    return visible_text_chars < MIN_VISIBLE_TEXT_CHARS or bool(JS_APP_MARKERS.search(html))
+
+def scrape_website_for_emails_http(
+    initial_url: str,
+    search_contact_pages: bool = True,
+    max_depth: int = 1,
+    max_contact_links_per_page: int = 5,
+    min_emails_required: int = None,
+    crawl_info: dict = None
+) -> tuple[list[str], bool]:
+    """
+    Scrapes a website for email addresses using plain HTTP requests only.
+
+    Returns:
+        A (emails, needs_browser) tuple. needs_browser is True when the homepage could not be
+        fetched or looks JS-rendered, in which case the caller should fall back to Playwright.
+        If crawl_info is given, the visited URLs and the homepage HTTP status are stored in it.
+    """
+    if not initial_url.startswith(('http://', 'https://')):
+        initial_url = 'https://' + initial_url
+
+    base_domain = urlparse(initial_url).netloc
+    all_emails_found = set()
+    visited_urls = set()
+    frontier = CrawlFrontier(initial_url)
+    needs_browser = False
+    if crawl_info is None:
+        crawl_info = {}
+    crawl_info['visited_urls'] = visited_urls
+
+    while frontier:
+        current_url, current_depth = frontier.pop()
+        if urlparse(current_url).netloc != base_domain:
+            continue
+        visited_urls.add(current_url)
+
+        status, final_url, html = fetch_html(current_url)
+        if current_depth == 0:
+            crawl_info['http_status'] = status
+        if html is None:
+            if current_depth == 0:
+                return sorted(all_emails_found), True
+            continue
+
+        if current_depth == 0 and urlparse(final_url).netloc != base_domain:
+            # Follow the homepage redirect (e.g. example.com -> www.example.com)
+            base_domain = urlparse(final_url).netloc
+
+        parser = _PageParser()
+        try:
+            parser.feed(html)
+            parser.close()
+        except Exception as e:
+            print(f"Error parsing HTML from {current_url}: {e}")
+
+        if current_depth == 0 and looks_js_rendered(html, parser.text_chars):
+            needs_browser = True
+
+        all_emails_found.update(extract_emails(html))
+        for href in parser.mailtos:
+            email = parse_mailto(href)
+            if email:
+                all_emails_found.add(email)
+
+        if min_emails_required is not None and len(all_emails_found) >= min_emails_required:
+            break
+
+        if search_contact_pages and current_depth < max_depth:
+            frontier.add_links(
+                rank_relevant_links(parser.anchors, final_url, CONTACT_KEYWORDS), current_depth + 1, max_contact_links_per_page
+            )
+
+    return sorted(all_emails_found), needs_browser
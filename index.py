@@ -1,11 +1,43 @@
 
 from playwright.sync_api import sync_playwright
 from scrape_email import scrape_website_for_emails
-import time, re, csv, os
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue
+from pipeline import EnrichmentPipeline
+from maps_parser import PlaceResponseCollector
+from listing_filters import DEFAULT_LISTING_FILTERS, rejection_reason
+from resource_blocking import apply_routing_profile
+from state_store import StateStore, STAGE_PENDING
+from place_index import get_place_index
+from result_store import csv_lock
+from metrics import (
+    MAPS_CARDS_SEEN, MAPS_CARDS_SKIPPED, MAPS_CARDS_CLICKED, MAPS_LISTINGS, MAPS_SCROLLS,
+    MAPS_CLICK_SECONDS, MAPS_SCROLL_SECONDS, RECORDS_WRITTEN, TERM_STARTED, TERM_FEED_DONE,
+    METRICS_PORT, SUMMARY_INTERVAL_SECONDS,
+    start_metrics_server, start_summary_reporter, stop_summary_reporter, summary
+)
+from maps_page import (
+    CARD_SELECTOR, PANEL_TITLE_SELECTOR,
+    mark_panel_stale, wait_for_panel, scroll_feed_and_wait, extract_new_cards, card_locator
+)
+import re, csv, os, time
+import multiprocessing
 from threading import Lock
 
+# Number of worker processes that scrape different search terms at the same time
+PARALLEL_WORKERS = 1
+
+# Read place details from the Maps network responses and only click cards whose data is incomplete
+USE_NETWORK_EXTRACTION = True
+NETWORK_REQUIRED_FIELDS = ('name', 'reviews', 'address', 'website', 'phone')
+
+# Rating/review ranges, has-website and category keywords; see listing_filters.py
+LISTING_FILTERS = dict(DEFAULT_LISTING_FILTERS)
+
+# Requests blocked in the Maps browser; see resource_blocking.ROUTING_PROFILES
+MAPS_ROUTING_PROFILE = 'maps'
+
+# Guards completed_search_term.txt; replaced by a cross-process lock in worker processes
+_completed_terms_lock = Lock()
+
 def read_search_terms():
     with open('search_terms.txt', 'r') as f:
         return [line.strip() for line in f if line.strip()]
@@ -26,8 +58,10 @@ def read_processed_ids(csv_filename):
     return processed_ids
 
 def mark_search_completed(search_term):
-    with open('completed_search_term.txt', 'a') as f:
-        f.write(f"{search_term}\n")
+    with _completed_terms_lock:
+        with open('completed_search_term.txt', 'a') as f:
+            f.write(f"{search_term}\n")
+            f.flush()
 
 
 def process_website_for_emails(place_data):
@@ -47,145 +81,296 @@ def save_to_csv(data, filename):
         return
     
     fieldnames = ['id', 'name', 'rating', 'reviews', 'address', 'website', 'phone', 'search_term', 'email']
-    file_exists = os.path.exists(filename)
-    
-    with open(filename, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerows(data)
-
-
-def scrape_google_maps_hotels():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-        search_terms = read_search_terms()
-        completed_terms = read_completed_terms()
-        
-        for search_term in search_terms:
-            if search_term in completed_terms:
-                print(f"Skipping already completed search: {search_term}")
-                continue
-                
-            print(f"Processing search term: {search_term}")
-            csv_filename = f"results/{search_term.replace(' ', '_')}.csv"
-            batch_data = []
-            processed_ids = read_processed_ids(csv_filename)
-            
-            page.goto(f"https://www.google.com/maps/search/{search_term}")
-            print(f"\n[DEBUG] Starting scrape_google_maps_hotels function")
-            print(f"[DEBUG] Found {len(search_terms)} search terms to process")
+    # Held so update_emails/validate_emails never compact the file under this append
+    with csv_lock(filename):
+        file_exists = os.path.exists(filename)
+        with open(filename, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerows(data)
 
-            page.wait_for_selector('div.Nv2PK')
 
-            scroll_container_selector = 'div[role="feed"]'
-            processed = set()
-            force_scroll_attempts = 0
-            max_force_scroll_attempts = 8
-            previous_card_count = 0  # Initialize the variable before the loop
-
-
-
-            while True:
-                cards = page.query_selector_all('div.Nv2PK')
-                print(f"[DEBUG] Loaded {len(processed_ids)} previously processed IDs from {csv_filename}")
-                print(f"[DEBUG] Navigating to Google Maps search for: {search_term}")
-                print(f"[DEBUG] Found {len(cards)} total cards on current page")
-
-                for card in cards:
-                    try:
-                        card_id = ''.join(filter(str.isalpha, card.get_attribute('data-result-id') or card.inner_text()))
-                        if card_id in processed or card_id in processed_ids:
-                            continue
-
-                        processed.add(card_id)
-                        card.scroll_into_view_if_needed()
-                        card.click()
-                        page.wait_for_selector('div.aIFcqe h1.DUwDvf')
-
-                        time.sleep(2)  # Wait for sidebar to fully render
-
-                        name = page.query_selector('div.aIFcqe h1.DUwDvf')
-
-                        # New extractions
-                        address = page.query_selector('button[data-item-id="address"]')
-                        website = page.query_selector('a[data-item-id="authority"]')
-                        phone = page.query_selector('button[data-item-id^="phone"]')
-                        phone = re.sub(r'[^\d+]', '', phone.inner_text())  # "+3905526261"
-
-                        # Extract rating based on aria-label containing "stars"
-                        # Extract rating based on aria-label containing "s
-                        rating_span = page.query_selector('div.F7nice span[aria-label*="stars"]')
-                        rating = rating_span.get_attribute('aria-label').split()[0] if rating_span else None
-                        rating = float(rating) if rating else None
-
-                        # Extract reviews based on aria-label containing "reviews"
-                        reviews_span = page.query_selector('div.F7nice span[aria-label*="reviews"]')
-                        reviews = reviews_span.inner_text() if reviews_span else None
-                        reviews = re.sub(r'[^\d]', '', reviews)  # "2601"
-                        reviews = int(reviews) if reviews else None
-
-                        # Apply filters for rating and reviews
-       
-                        place_data = {
-                            "id": card_id,
-                            "name": name.inner_text() if name else None,
-                            "rating": rating,
-                            "reviews": reviews,
-                            "address": address.inner_text() if address else None,
-                            "website": website.get_attribute('href') if website else None,
-                            "phone": phone,
-                            "search_term": search_term
-                        }
-
-                        if reviews is None or reviews <= 50:
-                            print(f"matches less less than 50 reviews. adding...")
-                            batch_data.append(place_data)
-                        else:
-                            print(f"more than 50 reviews. skipping...")
-
-                        if len(batch_data) >= 50:
-                            # Process emails concurrently using ThreadPoolExecutor
-                            with ThreadPoolExecutor(max_workers=4) as executor:
-                                processed_data = list(executor.map(process_website_for_emails, batch_data))
-                            save_to_csv(processed_data, csv_filename)
-                            batch_data = []
-
-                    except Exception as e:
-                        print("Error:", e)
-                        pass
-                
-                # Check if we found any new cards
-                current_card_count = len(processed)
-                if current_card_count == previous_card_count:
-                    force_scroll_attempts += 1
-                    if force_scroll_attempts >= max_force_scroll_attempts:
-                        print(f"No new cards found after {force_scroll_attempts} forced scroll attempts. Exiting...")
-                        # Save any remaining data before breaking
-                        if batch_data:
-                            save_to_csv(batch_data, csv_filename)
-                        mark_search_completed(search_term)
-                        break
+def extract_place_details_from_panel(page, card, expected_name=None, feature_id=None):
+    """Click a result card and read the place details from the sidebar panel."""
+    if not feature_id:
+        # Nothing in the URL identifies the place, so tell the new panel from the open one
+        mark_panel_stale(page)
+    card.scroll_into_view_if_needed()
+    card.click()
+
+    # Ready as soon as the panel shows the clicked place (not a same-named one opened before)
+    if not wait_for_panel(page, expected_name, feature_id):
+        raise RuntimeError(f"Detail panel did not show {expected_name!r} in time")
+
+    name = page.query_selector(PANEL_TITLE_SELECTOR)
+
+    # New extractions
+    address = page.query_selector('button[data-item-id="address"]')
+    website = page.query_selector('a[data-item-id="authority"]')
+    phone = page.query_selector('button[data-item-id^="phone"]')
+    phone = re.sub(r'[^\d+]', '', phone.inner_text()) if phone else None  # "+3905526261"
+
+    # Extract rating based on aria-label containing "stars"
+    rating_span = page.query_selector('div.F7nice span[aria-label*="stars"]')
+    rating = rating_span.get_attribute('aria-label').split()[0] if rating_span else None
+    rating = float(rating) if rating else None
+
+    # Extract reviews based on aria-label containing "reviews"
+    reviews_span = page.query_selector('div.F7nice span[aria-label*="reviews"]')
+    reviews = reviews_span.inner_text() if reviews_span else None
+    reviews = re.sub(r'[^\d]', '', reviews) if reviews else None  # "2601"
+    reviews = int(reviews) if reviews else None
+
+    return {
+        "name": name.inner_text() if name else None,
+        "rating": rating,
+        "reviews": reviews,
+        "address": address.inner_text() if address else None,
+        "website": website.get_attribute('href') if website else None,
+        "phone": phone
+    }
+
+def scrape_search_term(page, search_term, pipeline, store):
+    """Scrape every listing for one search term on the given page, feeding places into the pipeline."""
+    print(f"Processing search term: {search_term}")
+    TERM_STARTED.set(time.time(), term=search_term)
+    csv_filename = f"results/{search_term.replace(' ', '_')}.csv"
+    # Cards already in the CSV plus every card handled before a crash
+    processed_ids = read_processed_ids(csv_filename) | store.seen_card_ids(search_term)
+
+    collector = PlaceResponseCollector(page) if USE_NETWORK_EXTRACTION else None
+    try:
+        _scrape_search_results(page, search_term, csv_filename, processed_ids, pipeline, store, collector)
+    finally:
+        if collector:
+            collector.detach()
+
+def _scrape_search_results(page, search_term, csv_filename, processed_ids, pipeline, store, collector):
+    page.goto(f"https://www.google.com/maps/search/{search_term}")
+    print(f"\n[DEBUG] Starting scrape_search_term for: {search_term}")
+
+    page.wait_for_selector(CARD_SELECTOR)
+    if collector:
+        collector.collect_initial_state()
+
+    processed = set()
+    force_scroll_attempts = 0
+    max_force_scroll_attempts = 8
+    previous_card_count = 0  # Initialize the variable before the loop
+    reached_end = False
+
+    # Resuming after a crash: jump back to where we were before handling cards again
+    scroll_count = store.get_scroll_count(search_term)
+    if scroll_count:
+        print(f"Resuming {search_term} at scroll {scroll_count} with {len(processed_ids)} known cards")
+        card_count = 0
+        for _ in range(scroll_count):
+            card_count, reached_end = scroll_feed_and_wait(page, card_count)
+            if reached_end:
+                break
+
+    while True:
+        # One round-trip for every card that appeared since the last scroll
+        total_cards, cards = extract_new_cards(page)
+        print(f"[DEBUG] Loaded {len(processed_ids)} previously processed IDs from {csv_filename}")
+        print(f"[DEBUG] Navigating to Google Maps search for: {search_term}")
+        print(f"[DEBUG] Found {total_cards} total cards on current page, {len(cards)} new")
+        network_places = collector.collect() if collector else {}
+
+        for card in cards:
+            try:
+                # The Maps feature id is stable across searches; the letters of the card text are only a
+                # fallback (they include opening hours and review snippets) and the id of older rows
+                legacy_id = ''.join(filter(str.isalpha, card['result_id'] or card['text']))
+                card_id = card['feature_id'] or legacy_id
+                if any(known in processed or known in processed_ids for known in (card_id, legacy_id)):
+                    continue
+
+                processed.add(card_id)
+                MAPS_CARDS_SEEN.inc(term=search_term)
+
+                # Already scraped under another search term (by any worker process)
+                if get_place_index().owner(card_id) not in (None, search_term):
+                    print(f"Skipping {card['name']}: already scraped under another search term")
+                    MAPS_CARDS_SKIPPED.inc(term=search_term, reason='duplicate')
+                    store.mark_card_seen(search_term, card_id)
+                    continue
+
+                # Discard on what the feed already shows, before any click
+                reason = rejection_reason(card, LISTING_FILTERS)
+                if reason:
+                    print(f"Skipping {card['name']} from card data: {reason}")
+                    MAPS_CARDS_SKIPPED.inc(term=search_term, reason='card_filter')
+                    store.mark_card_seen(search_term, card_id)
+                    continue
+
+                # Matched on the feature id, so branches of a chain never share another branch's details
+                details = network_places.get(card['feature_id']) if network_places and card['feature_id'] else None
+
+                # Only open the detail panel when the network data is missing or incomplete
+                if details is None or any(details.get(field) is None for field in NETWORK_REQUIRED_FIELDS):
+                    MAPS_CARDS_CLICKED.inc(term=search_term)
+                    with MAPS_CLICK_SECONDS.time():
+                        clicked = extract_place_details_from_panel(
+                            page, card_locator(page, card['idx']), card['name'], card['feature_id']
+                        )
+                    if details is None:
+                        details = clicked
+                    else:
+                        details = {field: details.get(field) if details.get(field) is not None else value for field, value in clicked.items()}
+
+                place_data = {
+                    "id": card_id,
+                    **details,
+                    "search_term": search_term
+                }
+                reason = rejection_reason(place_data, LISTING_FILTERS)
+                # Claimed only once the record is submitted, so a failed click never hides the place from other terms
+                if reason is None and not get_place_index().claim_place(card_id, search_term):
+                    print(f"Skipping {card['name']}: claimed by another search term meanwhile")
+                    MAPS_CARDS_SKIPPED.inc(term=search_term, reason='duplicate')
+                    store.mark_card_seen(search_term, card_id)
+                elif reason is None:
+                    print(f"matches listing filters. adding...")
+                    store.mark_card_seen(search_term, card_id, place_data, csv_filename)
+                    MAPS_LISTINGS.inc(term=search_term)
+                    pipeline.submit(place_data, csv_filename)
                 else:
-                    force_scroll_attempts = 0
-                    previous_card_count = current_card_count
-
-                # Force scroll regardless of position
-                viewport_height = page.evaluate(f"document.querySelector('{scroll_container_selector}').clientHeight")
-                page.evaluate(f"""
-                    const container = document.querySelector('{scroll_container_selector}');
-                    container.scrollBy({{top: {viewport_height}, behavior: 'smooth'}});
-                """)
+                    print(f"{reason}. skipping...")
+                    MAPS_CARDS_SKIPPED.inc(term=search_term, reason='details_filter')
+                    store.mark_card_seen(search_term, card_id)
+
+            except Exception as e:
+                print("Error:", e)
+                pass
                 
-                # Wait for scroll and content to load
-                time.sleep(2)
-                print(f"Force-scrolled {force_scroll_attempts} times.")
-                page.wait_for_timeout(1000)
-                print(f"[DEBUG] Current batch size: {len(batch_data)}/50")
-                print(f"[DEBUG] Processing batch of {len(batch_data)} items for email scraping")
-                print(f"[DEBUG] Scroll metrics - Current cards: {current_card_count}, Previous: {previous_card_count}, Attempts: {force_scroll_attempts}")
+        # Check if the feed grew; cards skipped as already known still count as progress
+        current_card_count = total_cards
+        if current_card_count == previous_card_count:
+            force_scroll_attempts += 1
+            if reached_end or force_scroll_attempts >= max_force_scroll_attempts:
+                if reached_end:
+                    print("Reached the end of the results list. Exiting...")
+                else:
+                    print(f"No new cards found after {force_scroll_attempts} forced scroll attempts. Exiting...")
+                # Completion is recorded once the pipeline has written this term's records
+                TERM_FEED_DONE.set(1, term=search_term)
+                pipeline.finish_term(search_term)
+                return
+        else:
+            force_scroll_attempts = 0
+            previous_card_count = current_card_count
+
+        # Scroll the feed and wait only until new cards or the end-of-list marker show up
+        with MAPS_SCROLL_SECONDS.time():
+            _, reached_end = scroll_feed_and_wait(page, total_cards)
+        MAPS_SCROLLS.inc(term=search_term)
+        scroll_count += 1
+        store.record_scroll(search_term, scroll_count)
+        print(f"Force-scrolled {force_scroll_attempts} times.")
+        enrich_depth, write_depth = pipeline.queue_depths()
+        print(f"[DEBUG] Pipeline queues - Waiting for enrichment: {enrich_depth}, Waiting to be written: {write_depth}")
+        print(f"[DEBUG] Scroll metrics - Current cards: {current_card_count}, Previous: {previous_card_count}, Attempts: {force_scroll_attempts}")
+
+
+def scrape_terms(search_terms):
+    """Scrape a list of search terms sequentially on one browser page."""
+    store = StateStore()
+
+    def enrich(place_data):
+        place_data = process_website_for_emails(place_data)
+        store.mark_enriched(place_data)
+        return place_data
+
+    def write(records, csv_filename):
+        save_to_csv(records, csv_filename)
+        store.mark_written(records)
+        for place_data in records:
+            RECORDS_WRITTEN.inc(term=place_data.get('search_term'))
+
+    def complete(search_term):
+        mark_search_completed(search_term)
+        store.complete_term(search_term)
+
+    # Each worker process serves its own endpoint, on the next free port after METRICS_PORT
+    start_metrics_server(METRICS_PORT)
+    start_summary_reporter(SUMMARY_INTERVAL_SECONDS)
+    started_at = time.time()
+
+    # Enrichment and CSV writes run in the background while the Maps page keeps scrolling.
+    # A term is only marked completed once all of its records have been written.
+    try:
+        with sync_playwright() as p, EnrichmentPipeline(enrich, write, on_term_complete=complete) as pipeline:
+            resume_unfinished_records(store, pipeline, search_terms)
+
+            browser = p.chromium.launch(headless=True)
+            context = browser.new_context()
+            apply_routing_profile(context, MAPS_ROUTING_PROFILE)
+            page = context.new_page()
+            print(f"[DEBUG] Found {len(search_terms)} search terms to process")
+
+            for search_term in search_terms:
+                try:
+                    scrape_search_term(page, search_term, pipeline, store)
+                except Exception as e:
+                    # Leave the term pending so the next run picks it up again
+                    print(f"Error scraping search term {search_term}: {e}")
+    finally:
+        stop_summary_reporter()
+        print(summary(started_at))
+
+def resume_unfinished_records(store, pipeline, search_terms):
+    """Re-queue records a previous run scraped but never enriched or wrote."""
+    unfinished = store.unfinished_records(search_terms)
+    if not unfinished:
+        return
+    print(f"Resuming {len(unfinished)} unfinished records from {store.path}")
+    written_ids = {}
+    for stage, place_data, csv_filename in unfinished:
+        if stage == STAGE_PENDING:
+            pipeline.submit(place_data, csv_filename)
+            continue
+        # Crashed between the CSV append and the commit? Then it is already on disk.
+        if csv_filename not in written_ids:
+            written_ids[csv_filename] = read_processed_ids(csv_filename)
+        if place_data['id'] in written_ids[csv_filename]:
+            store.mark_written([place_data])
+        else:
+            pipeline.submit_enriched(place_data, csv_filename)
+
+def _init_term_worker(lock):
+    global _completed_terms_lock
+    _completed_terms_lock = lock
+
+def scrape_google_maps_hotels(parallel_workers=PARALLEL_WORKERS):
+    """Scrape all pending search terms, sharding them across worker processes when parallel_workers > 1."""
+    search_terms = read_search_terms()
+    completed_terms = read_completed_terms()
+
+    pending_terms = []
+    for search_term in search_terms:
+        if search_term in completed_terms:
+            print(f"Skipping already completed search: {search_term}")
+        elif search_term not in pending_terms:
+            pending_terms.append(search_term)
+
+    if not pending_terms:
+        print("All search terms are already completed.")
+        return
+
+    workers = max(1, min(parallel_workers, len(pending_terms)))
+    if workers == 1:
+        scrape_terms(pending_terms)
+        return
 
+    # Round-robin shards; each worker process runs its own browser, enrichment pipeline and CSVs
+    shards = [pending_terms[i::workers] for i in range(workers)]
+    print(f"Scraping {len(pending_terms)} search terms across {workers} worker processes")
+    lock = multiprocessing.Lock()
+    with multiprocessing.Pool(processes=workers, initializer=_init_term_worker, initargs=(lock,)) as pool:
+        for _ in pool.imap_unordered(scrape_terms, shards):
+            pass
 
-scrape_google_maps_hotels()
+if __name__ == '__main__':
+    scrape_google_maps_hotels()
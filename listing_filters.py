@@ -0,0 +1,49 @@
+from typing import Optional
+
+# Default filters: keep places with 50 reviews or fewer. None disables a bound.
+DEFAULT_LISTING_FILTERS = {
+    'min_rating': None,
+    'max_rating': None,
+    'min_reviews': None,
+    'max_reviews': 50,
+    'require_website': False,
+    'category_keywords': [],   # If set, the card text must contain one of these (case-insensitive)
+}
+
+
+def rejection_reason(listing: dict, filters: dict = DEFAULT_LISTING_FILTERS) -> Optional[str]:
+    """
+    Checks a listing against the filters and returns why it was rejected, or None if it passes.
+
+    Works on both card data from the result feed (has_website, text) and full place records
+    (website). Fields that are unknown (None) never cause a rejection, so a card is only
+    discarded early when its visible data already rules it out.
+    """
+    rating = listing.get('rating')
+    if rating is not None:
+        if filters.get('min_rating') is not None and rating < filters['min_rating']:
+            return f"rating {rating} below {filters['min_rating']}"
+        if filters.get('max_rating') is not None and rating > filters['max_rating']:
+            return f"rating {rating} above {filters['max_rating']}"
+
+    reviews = listing.get('reviews')
+    if reviews is not None:
+        if filters.get('min_reviews') is not None and reviews < filters['min_reviews']:
+            return f"{reviews} reviews, fewer than {filters['min_reviews']}"
+        if filters.get('max_reviews') is not None and reviews > filters['max_reviews']:
+            return f"{reviews} reviews, more than {filters['max_reviews']}"
+
+    if filters.get('require_website'):
+        # Cards only report a website they show (True or None); full records know for sure
+        has_website = listing['has_website'] if 'has_website' in listing else bool(listing.get('website'))
+        if has_website is False:
+            return "no website"
+
+    keywords = filters.get('category_keywords')
+    text = listing.get('text')
+    if keywords and text is not None:
+        lowered = text.lower()
+        if not any(keyword.lower() in lowered for keyword in keywords):
+            return "no matching category keyword"
+
+    return None
@@ -0,0 +1,155 @@
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+import re
+
+# Google Maps DOM selectors
+CARD_SELECTOR = 'div.Nv2PK'
+CARD_LINK_SELECTOR = 'a.hfpxzc'
+FEED_SELECTOR = 'div[role="feed"]'
+PANEL_TITLE_SELECTOR = 'div.aIFcqe h1.DUwDvf'
+END_OF_LIST_SELECTOR = 'span.HlvSq'   # "You've reached the end of the list."
+
+# A place's feature id as it appears in card links (".../data=!...!1s0x47132a...:0x9c6e...!...")
+FEATURE_ID_PATTERN = re.compile(r'0x[0-9a-f]+:0x[0-9a-f]+', re.IGNORECASE)
+
+# Upper bounds only; every wait returns as soon as its condition is met
+PANEL_TIMEOUT_MS = 10000
+SCROLL_TIMEOUT_MS = 5000
+
+
+def mark_panel_stale(page) -> None:
+    """Tags the currently open panel title with its text, so wait_for_panel can tell a new panel from it."""
+    page.evaluate(
+        """(selector) => {
+            const title = document.querySelector(selector);
+            if (title) title.dataset.scraperStale = title.innerText;
+        }""",
+        PANEL_TITLE_SELECTOR
+    )
+
+def wait_for_panel(page, expected_name: str = None, feature_id: str = None, timeout: int = PANEL_TIMEOUT_MS) -> bool:
+    """
+    Waits until the detail panel shows the clicked place.
+
+    A matching title alone is not enough, since branches of a chain share their name. With
+    feature_id the page URL must also carry the place's feature id, which Maps puts in the
+    URL of every place it opens. Without one the title must not be the node tagged by
+    mark_panel_stale before the click, unless its text has changed since. With expected_name the panel title must match it
+    after Unicode normalisation, whitespace collapsing (NBSP included) and lowercasing,
+    since the card's aria-label and the panel title often differ in exactly those ways.
+    Returns False on timeout.
+    """
+    try:
+        page.wait_for_function(
+            """([selector, name, featureId]) => {
+                const normalize = (text) => text.normalize('NFKC').replace(/\\s+/g, ' ').trim().toLowerCase();
+                const title = document.querySelector(selector);
+                if (!title || (name && normalize(title.innerText) !== normalize(name))) return false;
+                if (!featureId) return title.dataset.scraperStale !== title.innerText;
+                let url = location.href;
+                try { url = decodeURIComponent(url); } catch (e) {}
+                return url.toLowerCase().includes(featureId);
+            }""",
+            arg=[PANEL_TITLE_SELECTOR, expected_name, feature_id],
+            timeout=timeout
+        )
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+def is_end_of_list(page) -> bool:
+    """True once Maps shows its end-of-results marker at the bottom of the feed."""
+    return page.query_selector(END_OF_LIST_SELECTOR) is not None
+
+def scroll_feed_and_wait(page, previous_count: int, timeout: int = SCROLL_TIMEOUT_MS) -> tuple[int, bool]:
+    """
+    Scrolls the result feed to the bottom and waits for new cards or the end-of-list marker.
+
+    Returns:
+        A (card_count, reached_end) tuple.
+    """
+    page.evaluate(
+        """(selector) => {
+            const container = document.querySelector(selector);
+            if (container) container.scrollTop = container.scrollHeight;
+        }""",
+        FEED_SELECTOR
+    )
+    try:
+        state = page.wait_for_function(
+            """([cardSelector, endSelector, previous]) => {
+                const count = document.querySelectorAll(cardSelector).length;
+                const end = !!document.querySelector(endSelector);
+                return (count > previous || end) ? [count, end] : false;
+            }""",
+            arg=[CARD_SELECTOR, END_OF_LIST_SELECTOR, previous_count],
+            timeout=timeout
+        ).json_value()
+        return state[0], state[1]
+    except PlaywrightTimeoutError:
+        return previous_count, is_end_of_list(page)
+
+# Marks every card it returns with data-scraper-idx so later calls only return cards not seen before
+_EXTRACT_NEW_CARDS_JS = """([cardSelector, linkSelector]) => {
+    const cards = document.querySelectorAll(cardSelector);
+    let next = window.__scraperNextCardIdx || 0;
+    const fresh = [];
+    for (const card of cards) {
+        if (card.dataset.scraperIdx !== undefined) continue;
+        card.dataset.scraperIdx = String(next);
+        const link = card.querySelector(linkSelector);
+        const rating = card.querySelector('span.MW4etd');
+        const reviews = card.querySelector('span.UY7F9');
+        fresh.push({
+            idx: next,
+            result_id: card.getAttribute('data-result-id'),
+            text: card.innerText || '',
+            name: link ? link.getAttribute('aria-label') : null,
+            link: link ? link.href : null,
+            rating: rating ? rating.innerText : null,
+            reviews: reviews ? reviews.innerText : null,
+            // Cards often omit the Website button, so its absence is unknown (null), not false
+            has_website: card.querySelector('a[data-value="Website"], a[aria-label*="website" i]') ? true : null
+        });
+        next += 1;
+    }
+    window.__scraperNextCardIdx = next;
+    return {total: cards.length, cards: fresh};
+}"""
+
+def _parse_number(text: str, cast):
+    digits = re.sub(r'[^\d.,]', '', text or '')
+    if not digits:
+        return None
+    try:
+        if cast is int:
+            return int(re.sub(r'[^\d]', '', digits))
+        return cast(digits.replace(',', '.'))
+    except ValueError:
+        return None
+
+def card_feature_id(card: dict):
+    """The place's "0x...:0x..." feature id from the card's link or data-result-id, or None."""
+    for source in (card.get('link'), card.get('result_id')):
+        match = FEATURE_ID_PATTERN.search(source or '')
+        if match:
+            return match.group(0).lower()
+    return None
+
+def extract_new_cards(page) -> tuple[int, list[dict]]:
+    """
+    Pulls id, name, rating, review count and link for every card not returned before, in one page.evaluate.
+
+    Returns:
+        A (total_cards_in_feed, new_cards) tuple. Each card dict carries idx, result_id, feature_id,
+        text, name, link, rating (float), reviews (int) and has_website (True, or None when unknown).
+    """
+    batch = page.evaluate(_EXTRACT_NEW_CARDS_JS, [CARD_SELECTOR, CARD_LINK_SELECTOR])
+    for card in batch['cards']:
+        card['feature_id'] = card_feature_id(card)
+        card['rating'] = _parse_number(card['rating'], float)
+        card['reviews'] = _parse_number(card['reviews'], int)
+    return batch['total'], batch['cards']
+
+def card_locator(page, idx: int):
+    """Locator for a card previously returned by extract_new_cards."""
+    return page.locator(f'{CARD_SELECTOR}[data-scraper-idx="{idx}"]')
@@ -0,0 +1,141 @@
+from urllib.parse import urlparse, parse_qs
+import json
+import re
+
+# Maps XHR endpoints that carry place data for the result feed and the detail panel
+PLACE_DATA_URL_PATTERN = re.compile(r'/search\?tbm=map|/maps/preview/place|/maps/preview/entity')
+
+XSSI_PREFIX = ")]}'"
+
+
+def _dig(data, *path):
+    """Safely index into nested lists, returning None if any step is missing."""
+    for key in path:
+        if not isinstance(data, list) or not isinstance(key, int) or key >= len(data):
+            return None
+        data = data[key]
+    return data
+
+def _loads_maps_json(text: str):
+    """Parses a Maps payload, stripping the XSSI guard and the {"d": "..."} envelope if present."""
+    if not text:
+        return None
+    text = text.strip()
+    if text.endswith('/*""*/'):
+        text = text[:-len('/*""*/')]
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if isinstance(data, dict) and isinstance(data.get('d'), str):
+        return _loads_maps_json(data['d'])
+    return data
+
+def _looks_like_place(node) -> bool:
+    # Place arrays carry the name at [11] and the "0x...:0x..." feature id at [10]
+    return (
+        isinstance(node, list) and len(node) > 40
+        and isinstance(_dig(node, 11), str)
+        and isinstance(_dig(node, 10), str) and _dig(node, 10).startswith('0x') and ':' in _dig(node, 10)
+    )
+
+def _find_places(node, found, depth=0):
+    if depth > 12:
+        return
+    if isinstance(node, str) and node.startswith(XSSI_PREFIX):
+        # Embedded payloads (e.g. APP_INITIALIZATION_STATE) are JSON strings inside JSON
+        _find_places(_loads_maps_json(node), found, depth + 1)
+    elif _looks_like_place(node):
+        found.append(node)
+    elif isinstance(node, list):
+        for child in node:
+            _find_places(child, found, depth + 1)
+
+def _place_to_record(place: list) -> dict:
+    """Maps a raw place array onto the same fields the detail panel extraction produces."""
+    address = _dig(place, 39) or _dig(place, 18)
+    website = _dig(place, 7, 0)
+    if isinstance(website, str) and website.startswith('/url?'):
+        # Some listings link through a Google redirect
+        website = parse_qs(urlparse(website).query).get('q', [website])[0]
+    phone = _dig(place, 178, 0, 0) or _dig(place, 178, 0, 1, 1, 0)
+    rating = _dig(place, 4, 7)
+    reviews = _dig(place, 4, 8)
+    return {
+        "name": _dig(place, 11),
+        "rating": float(rating) if isinstance(rating, (int, float)) else None,
+        "reviews": int(reviews) if isinstance(reviews, (int, float)) else None,
+        "address": address if isinstance(address, str) else None,
+        "website": website if isinstance(website, str) else None,
+        "phone": re.sub(r'[^\d+]', '', phone) if isinstance(phone, str) else None
+    }
+
+def _merge_place(places: dict, feature_id: str, record: dict) -> None:
+    """Adds record under feature_id, filling in fields an earlier record for the same place left empty."""
+    existing = places.setdefault(feature_id, record)
+    for field, value in record.items():
+        if existing.get(field) is None and value is not None:
+            existing[field] = value
+
+def parse_places(payload) -> dict[str, dict]:
+    """
+    Extracts place records from a Maps network response body or an APP_INITIALIZATION_STATE dump.
+
+    Returns:
+        A dict mapping each place's feature id ("0x...:0x...") to a dict with name, rating,
+        reviews, address, website and phone (None when absent). Same-named places, such as
+        branches of a chain, stay separate.
+    """
+    data = _loads_maps_json(payload) if isinstance(payload, str) else payload
+    found = []
+    _find_places(data, found)
+    places = {}
+    for place in found:
+        _merge_place(places, _dig(place, 10).lower(), _place_to_record(place))
+    return places
+
+
+class PlaceResponseCollector:
+    """
+    Records Maps place-data responses on a page and parses them in bulk on demand.
+
+    Response bodies are read from the scraping thread in collect(), not inside
+    the Playwright event handler, so no blocking calls happen during dispatch.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.places = {}       # feature id -> record
+        self._responses = []
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if PLACE_DATA_URL_PATTERN.search(response.url):
+            self._responses.append(response)
+
+    def _add(self, places: dict):
+        for feature_id, record in places.items():
+            _merge_place(self.places, feature_id, record)
+
+    def collect_initial_state(self):
+        """Parses the first page of results, which Maps embeds in the HTML instead of fetching."""
+        try:
+            state = self.page.evaluate("JSON.stringify(window.APP_INITIALIZATION_STATE || null)")
+            self._add(parse_places(json.loads(state)))
+        except Exception as e:
+            print(f"Could not read APP_INITIALIZATION_STATE: {e}")
+
+    def collect(self) -> dict:
+        """Parses every response captured since the last call and returns all known places by feature id."""
+        responses, self._responses = self._responses, []
+        for response in responses:
+            try:
+                self._add(parse_places(response.text()))
+            except Exception as e:
+                print(f"Could not parse Maps response {response.url[:80]}: {e}")
+        return self.places
+
+    def detach(self):
+        self.page.remove_listener("response", self._on_response)
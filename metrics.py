@@ -0,0 +1,378 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Lock, Event
+from bisect import bisect_left
+from typing import Optional
+import time
+
+METRICS_PORT = 9108                 # Local /metrics endpoint; None disables it. Worker processes take the next free port.
+METRICS_PORT_ATTEMPTS = 16
+SUMMARY_INTERVAL_SECONDS = 60       # Periodic progress summary; None disables it
+EXPECTED_RESULTS_PER_TERM = 120     # Google Maps stops listing results around here; used for the ETA
+
+# Histogram buckets in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PAGES_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+    def _format_labels(self, key: tuple, extra: str = '') -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """The count for these labels, or the sum over all labels when none are given."""
+        with self._lock:
+            if labels:
+                return self._values.get(self._key(labels), 0)
+            return sum(self._values.values())
+
+    def values(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def time(self, **labels) -> '_Timer':
+        """Context manager that observes the duration of its block."""
+        return _Timer(self, labels)
+
+    def _merged(self, labels: dict) -> list:
+        with self._lock:
+            if labels:
+                series = self._series.get(self._key(labels))
+                return list(series) if series else [0] * (len(self.buckets) + 2)
+            merged = [0] * (len(self.buckets) + 2)
+            for series in self._series.values():
+                merged = [a + b for a, b in zip(merged, series)]
+            return merged
+
+    def count(self, **labels) -> int:
+        return int(sum(self._merged(labels)[:-1]))
+
+    def mean(self, **labels) -> Optional[float]:
+        series = self._merged(labels)
+        count = sum(series[:-1])
+        return series[-1] / count if count else None
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate from the buckets, interpolating linearly inside the bucket that holds the quantile."""
+        series = self._merged(labels)
+        count = sum(series[:-1])
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for i, bucket_count in enumerate(series[:-1]):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def render(self) -> list[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """All metrics of this process, plus collector callbacks that refresh gauges before each read."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, fn) -> None:
+        with self._lock:
+            self._collectors.append(fn)
+
+    def remove_collector(self, fn) -> None:
+        with self._lock:
+            if fn in self._collectors:
+                self._collectors.remove(fn)
+
+    def collect(self) -> None:
+        with self._lock:
+            collectors = list(self._collectors)
+        for fn in collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[metrics] Collector failed: {e}")
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        self.collect()
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Google Maps stage
+MAPS_CARDS_SEEN = REGISTRY.counter('maps_cards_seen_total', 'Result cards that appeared in the feed', ('term',))
+MAPS_CARDS_SKIPPED = REGISTRY.counter('maps_cards_skipped_total', 'Cards skipped without scraping', ('term', 'reason'))
+MAPS_CARDS_CLICKED = REGISTRY.counter('maps_cards_clicked_total', 'Cards whose detail panel was opened', ('term',))
+MAPS_LISTINGS = REGISTRY.counter('maps_listings_total', 'Listings that passed the filters and entered the pipeline', ('term',))
+MAPS_SCROLLS = REGISTRY.counter('maps_scrolls_total', 'Feed scrolls', ('term',))
+MAPS_CLICK_SECONDS = REGISTRY.histogram('maps_click_seconds', 'Time to open a detail panel and read it')
+MAPS_SCROLL_SECONDS = REGISTRY.histogram('maps_scroll_seconds', 'Time for a feed scroll to load new cards')
+
+# Email enrichment stage
+EMAIL_CACHE_REQUESTS = REGISTRY.counter('email_cache_requests_total', 'Per-domain crawl cache lookups', ('result',))
+SITES_CRAWLED = REGISTRY.counter('sites_crawled_total', 'Websites crawled for emails', ('tier', 'outcome'))
+CRAWL_SECONDS = REGISTRY.histogram('email_crawl_seconds', 'Time to crawl one website', ('tier',))
+PAGES_PER_SITE = REGISTRY.histogram('email_crawl_pages', 'Pages visited per website crawl', ('tier',), PAGES_BUCKETS)
+
+# Validation stage
+MX_CACHE_REQUESTS = REGISTRY.counter('mx_cache_requests_total', 'MX verdict cache lookups', ('result',))
+DNS_SECONDS = REGISTRY.histogram('dns_lookup_seconds', 'MX lookup latency', ('outcome',))
+
+# Pipeline and per-term progress
+QUEUE_DEPTH = REGISTRY.gauge('pipeline_queue_depth', 'Records waiting in the enrichment pipeline', ('queue',))
+RECORDS_WRITTEN = REGISTRY.counter('pipeline_records_written_total', 'Records appended to the result CSVs', ('term',))
+TERM_STARTED = REGISTRY.gauge('term_started_timestamp_seconds', 'When scraping of a search term started', ('term',))
+TERM_FEED_DONE = REGISTRY.gauge('term_feed_done', '1 once the Maps feed of a search term is exhausted', ('term',))
+
+
+def hit_rate(counter: Counter) -> Optional[float]:
+    hits, misses = counter.value(result='hit'), counter.value(result='miss')
+    return hits / (hits + misses) if hits + misses else None
+
+def term_eta_seconds(term: str, now: float = None) -> Optional[float]:
+    """
+    Rough time until every record of the term is written.
+
+    Cards still expected from the feed (up to EXPECTED_RESULTS_PER_TERM) at the term's card
+    rate, plus the records still in the pipeline at the term's write rate.
+    """
+    started = TERM_STARTED.value(term=term)
+    if not started:
+        return None
+    elapsed = max(1.0, (now or time.time()) - started)
+    seen = MAPS_CARDS_SEEN.value(term=term)
+    listings = MAPS_LISTINGS.value(term=term)
+    written = RECORDS_WRITTEN.value(term=term)
+
+    eta = 0.0
+    if not TERM_FEED_DONE.value(term=term):
+        if not seen:
+            return None
+        remaining_cards = max(0, EXPECTED_RESULTS_PER_TERM - seen)
+        eta += remaining_cards / (seen / elapsed)
+        listings += remaining_cards * (listings / seen)
+    if listings > written:
+        if not written:
+            return None
+        eta = max(eta, (listings - written) / (written / elapsed))
+    return eta
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '?'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+def _format_ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.0f}ms" if seconds is not None else '-'
+
+def _format_rate(rate: Optional[float]) -> str:
+    return f"{rate:.0%}" if rate is not None else '-'
+
+def summary(started_at: float) -> str:
+    """Human-readable snapshot of every stage, one line per active search term."""
+    REGISTRY.collect()
+    now = time.time()
+    minutes = max(1e-9, (now - started_at) / 60)
+    lines = [
+        f"[metrics] {_format_duration(now - started_at)} elapsed"
+        f" | maps: {MAPS_CARDS_SEEN.value():.0f} cards, {MAPS_CARDS_CLICKED.value():.0f} clicked,"
+        f" {MAPS_LISTINGS.value() / minutes:.1f} listings/min, click p95 {_format_ms(MAPS_CLICK_SECONDS.quantile(0.95))}"
+        f" | crawl: {SITES_CRAWLED.value():.0f} sites, {PAGES_PER_SITE.mean() or 0:.1f} pages/site,"
+        f" p50 {_format_ms(CRAWL_SECONDS.quantile(0.5))} p95 {_format_ms(CRAWL_SECONDS.quantile(0.95))}"
+        f" | dns p95 {_format_ms(DNS_SECONDS.quantile(0.95))}"
+        f" | cache hits: email {_format_rate(hit_rate(EMAIL_CACHE_REQUESTS))}, mx {_format_rate(hit_rate(MX_CACHE_REQUESTS))}"
+        f" | queues: enrich {QUEUE_DEPTH.value(queue='enrich'):.0f}, write {QUEUE_DEPTH.value(queue='write'):.0f}"
+    ]
+    for (term,), started in sorted(TERM_STARTED.values().items()):
+        written = RECORDS_WRITTEN.value(term=term)
+        listings = MAPS_LISTINGS.value(term=term)
+        if TERM_FEED_DONE.value(term=term) and written >= listings:
+            continue
+        lines.append(
+            f"[metrics]   {term}: {MAPS_CARDS_SEEN.value(term=term):.0f} cards, {MAPS_CARDS_CLICKED.value(term=term):.0f} clicked,"
+            f" {listings:.0f} listings, {written:.0f} written | ETA {_format_duration(term_eta_seconds(term, now))}"
+        )
+    return '\n'.join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_reporter_stop = None
+_start_lock = Lock()
+
+def start_metrics_server(port: int = METRICS_PORT) -> Optional[int]:
+    """
+    Serves /metrics on 127.0.0.1 from a daemon thread. Tries the following ports when
+    port is taken (e.g. by another worker process). Returns the port, or None if disabled.
+    """
+    global _server
+    with _start_lock:
+        if _server is not None:
+            return _server.server_address[1]
+        if port is None:
+            return None
+        for candidate in range(port, port + METRICS_PORT_ATTEMPTS):
+            try:
+                _server = ThreadingHTTPServer(('127.0.0.1', candidate), _MetricsHandler)
+                break
+            except OSError:
+                continue
+        else:
+            print(f"[metrics] No free port in {port}-{port + METRICS_PORT_ATTEMPTS - 1}; endpoint disabled")
+            return None
+        _server.daemon_threads = True
+        Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"[metrics] Serving http://127.0.0.1:{candidate}/metrics")
+        return candidate
+
+def start_summary_reporter(interval: float = SUMMARY_INTERVAL_SECONDS) -> None:
+    """Prints summary() every interval seconds from a daemon thread until stop_summary_reporter()."""
+    global _reporter_stop
+    with _start_lock:
+        if interval is None or _reporter_stop is not None:
+            return
+        _reporter_stop = Event()
+        stop = _reporter_stop
+    started_at = time.time()
+
+    def report():
+        while not stop.wait(interval):
+            print(summary(started_at))
+
+    Thread(target=report, name="metrics-summary", daemon=True).start()
+
+def stop_summary_reporter() -> None:
+    global _reporter_stop
+    with _start_lock:
+        stop, _reporter_stop = _reporter_stop, None
+    if stop is not None:
+        stop.set()
@@ -0,0 +1,163 @@
+from queue import Queue, Empty
+from threading import Thread, Lock
+from metrics import REGISTRY, QUEUE_DEPTH
+
+ENRICHMENT_WORKERS = 4
+ENRICHMENT_QUEUE_SIZE = 200   # Maps scraping blocks once this many places are waiting for enrichment
+WRITE_BATCH_SIZE = 20         # Max records flushed to a CSV in one write
+
+_STOP = object()
+
+
+class EnrichmentPipeline:
+    """
+    Streams place records from the Maps scraper through email enrichment to disk.
+
+    The scraper (producer) calls submit() for every qualifying place. A pool of
+    enrichment threads consumes the bounded input queue continuously, and a
+    single writer thread appends finished records to their CSV as they arrive.
+    Once the producer calls finish_term() and every record of that term has
+    been written, on_term_complete(search_term) is invoked. A term with a
+    failed write is never reported complete, so the next run picks it up again.
+    """
+
+    def __init__(
+        self,
+        process_fn,
+        write_fn,
+        on_term_complete=None,
+        workers: int = ENRICHMENT_WORKERS,
+        queue_size: int = ENRICHMENT_QUEUE_SIZE
+    ):
+        self.process_fn = process_fn
+        self.write_fn = write_fn
+        self.on_term_complete = on_term_complete
+        self.input_queue = Queue(maxsize=queue_size)
+        self.output_queue = Queue()
+        self._lock = Lock()
+        self._pending = {}          # search_term -> records submitted but not yet written
+        self._finished_terms = set()
+        self._failed_terms = set()  # Terms with records whose write failed
+        self._workers = [Thread(target=self._enrich_worker, name=f"enrich-{i}", daemon=True) for i in range(max(1, workers))]
+        self._writer = Thread(target=self._write_worker, name="csv-writer", daemon=True)
+        for thread in self._workers:
+            thread.start()
+        self._writer.start()
+        REGISTRY.add_collector(self._collect_metrics)
+
+    def submit(self, place_data: dict, csv_filename: str) -> None:
+        """Queue a place for enrichment. Blocks while the queue is full."""
+        with self._lock:
+            term = place_data.get('search_term')
+            self._pending[term] = self._pending.get(term, 0) + 1
+        self.input_queue.put((place_data, csv_filename))
+
+    def submit_enriched(self, place_data: dict, csv_filename: str) -> None:
+        """Queue an already enriched place straight for writing, e.g. when resuming after a crash."""
+        with self._lock:
+            term = place_data.get('search_term')
+            self._pending[term] = self._pending.get(term, 0) + 1
+        self.output_queue.put((place_data, csv_filename))
+
+    def finish_term(self, search_term: str) -> None:
+        """Signal that no more places will be submitted for search_term."""
+        with self._lock:
+            self._finished_terms.add(search_term)
+        self._check_term_complete(search_term)
+
+    def _check_term_complete(self, search_term: str) -> None:
+        with self._lock:
+            if search_term not in self._finished_terms or self._pending.get(search_term, 0) > 0:
+                return
+            self._finished_terms.discard(search_term)
+            self._pending.pop(search_term, None)
+            failed = search_term in self._failed_terms
+        if failed:
+            print(f"Not marking {search_term!r} completed: some of its records could not be written")
+            return
+        if self.on_term_complete:
+            self.on_term_complete(search_term)
+
+    def _enrich_worker(self):
+        while True:
+            item = self.input_queue.get()
+            if item is _STOP:
+                self.input_queue.task_done()
+                break
+            place_data, csv_filename = item
+            try:
+                place_data = self.process_fn(place_data)
+            except Exception as e:
+                print(f"Error enriching {place_data.get('name')}: {e}")
+            self.output_queue.put((place_data, csv_filename))
+            self.input_queue.task_done()
+
+    def _write_worker(self):
+        stopping = False
+        while not stopping:
+            item = self.output_queue.get()
+            batch = [item]
+            # Drain whatever else is already finished, up to the batch size
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self.output_queue.get_nowait())
+                except Empty:
+                    break
+
+            by_file = {}
+            for entry in batch:
+                if entry is _STOP:
+                    stopping = True
+                    continue
+                place_data, csv_filename = entry
+                by_file.setdefault(csv_filename, []).append(place_data)
+
+            failed_files = set()
+            for csv_filename, records in by_file.items():
+                try:
+                    self.write_fn(records, csv_filename)
+                except Exception as e:
+                    # The records stay unwritten in the state store and are re-queued by the next run
+                    print(f"Error writing {len(records)} records to {csv_filename}: {e}")
+                    failed_files.add(csv_filename)
+
+            terms = set()
+            with self._lock:
+                for csv_filename, records in by_file.items():
+                    for place_data in records:
+                        term = place_data.get('search_term')
+                        self._pending[term] = self._pending.get(term, 1) - 1
+                        if csv_filename in failed_files:
+                            self._failed_terms.add(term)
+                        terms.add(term)
+            for term in terms:
+                self._check_term_complete(term)
+
+            for _ in batch:
+                self.output_queue.task_done()
+
+    def queue_depths(self) -> tuple[int, int]:
+        """Current (waiting for enrichment, waiting to be written) queue sizes."""
+        return self.input_queue.qsize(), self.output_queue.qsize()
+
+    def _collect_metrics(self) -> None:
+        enrich_depth, write_depth = self.queue_depths()
+        QUEUE_DEPTH.set(enrich_depth, queue='enrich')
+        QUEUE_DEPTH.set(write_depth, queue='write')
+
+    def close(self) -> None:
+        """Wait for every submitted record to be enriched and written, then stop all threads."""
+        for _ in self._workers:
+            self.input_queue.put(_STOP)
+        for thread in self._workers:
+            thread.join()
+        self.output_queue.put(_STOP)
+        self._writer.join()
+        REGISTRY.remove_collector(self._collect_metrics)
+        self._collect_metrics()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
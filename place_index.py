@@ -0,0 +1,75 @@
+from threading import Lock
+from urllib.parse import urlparse
+from typing import Optional
+from sqlite_store import open_sqlite
+import time
+
+PLACE_INDEX_DB_PATH = 'place_index.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    place_id TEXT PRIMARY KEY,
+    search_term TEXT NOT NULL,
+    claimed_at REAL NOT NULL
+);
+"""
+
+
+def normalize_domain(url: str) -> Optional[str]:
+    """'https://WWW.Example.com:443/contact' -> 'example.com'."""
+    if not url:
+        return None
+    if '://' not in url:
+        url = 'https://' + url
+    host = (urlparse(url).hostname or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    return host or None
+
+
+class PlaceIndex:
+    """
+    Global record of every place already handled, across all search terms.
+
+    Backed by SQLite in WAL mode so every thread and worker process shares it. Places are
+    keyed by their Maps feature id ("0x...:0x..."). A place is claimed by the first search
+    term that submits its record; other terms check owner() and skip it before clicking.
+    Emails per website domain live in email_cache, not here.
+    """
+
+    def __init__(self, path: str = PLACE_INDEX_DB_PATH):
+        self.path = path
+        self._lock = Lock()
+        self._conn = open_sqlite(path, SCHEMA)
+
+    def owner(self, place_id: str) -> Optional[str]:
+        """The search term that claimed the place, or None if no term has yet."""
+        with self._lock:
+            row = self._conn.execute("SELECT search_term FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim_place(self, place_id: str, search_term: str) -> bool:
+        """True if this term owns the place (first to claim it, or claimed it on an earlier run)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO places (place_id, search_term, claimed_at) VALUES (?, ?, ?)",
+                (place_id, search_term, time.time())
+            )
+            row = self._conn.execute("SELECT search_term FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        return row is not None and row[0] == search_term
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_index = None
+_default_index_lock = Lock()
+
+def get_place_index() -> PlaceIndex:
+    """Return this process's connection to the shared place index."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = PlaceIndex()
+        return _default_index
@@ -0,0 +1,85 @@
+from urllib.parse import urlparse
+import re
+
+# Third-party analytics/ads hosts that never carry data we scrape
+TRACKER_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'googlesyndication.com',
+    'doubleclick.net', 'facebook.net', 'connect.facebook.net', 'hotjar.com', 'clarity.ms',
+    'segment.io', 'segment.com', 'mixpanel.com', 'amplitude.com', 'fullstory.com', 'newrelic.com',
+    'nr-data.net', 'criteo.com', 'taboola.com', 'outbrain.com', 'adnxs.com', 'scorecardresearch.com',
+    'quantserve.com', 'tiktok.com', 'snap.licdn.com', 'bat.bing.com', 'yandex.ru', 'matomo.cloud'
+)
+
+# Map imagery: raster/vector tiles, satellite and street-view thumbnails
+MAP_TILE_PATTERN = re.compile(r'/maps/vt|/kh/v=|khms\d*\.google|/maps/api/staticmap|streetviewpixels|/vt/pb=')
+
+# Per-stage presets. resource_types are Playwright request.resource_type values.
+ROUTING_PROFILES = {
+    # Google Maps: fonts and stylesheets stay, since card and panel selectors depend on the layout
+    'maps': {
+        'resource_types': {'image', 'media'},
+        'block_trackers': True,
+        'block_map_tiles': True,
+    },
+    # Business websites: only the HTML and scripts matter for finding emails
+    'crawler': {
+        'resource_types': {'image', 'media', 'font', 'stylesheet'},
+        'block_trackers': True,
+        'block_map_tiles': False,
+    },
+    'off': None,
+}
+
+
+def _resolve_profile(profile):
+    if isinstance(profile, str):
+        if profile not in ROUTING_PROFILES:
+            raise ValueError(f"Unknown routing profile: {profile}")
+        return ROUTING_PROFILES[profile]
+    return profile
+
+def is_tracker_host(host: str) -> bool:
+    host = (host or '').lower()
+    return any(host == tracker or host.endswith('.' + tracker) for tracker in TRACKER_HOSTS)
+
+def should_block(url: str, resource_type: str, profile: dict) -> bool:
+    """Decide whether a request should be aborted under the given profile."""
+    if not profile:
+        return False
+    if resource_type in profile.get('resource_types', ()):
+        return True
+    if profile.get('block_trackers') and is_tracker_host(urlparse(url).hostname):
+        return True
+    if profile.get('block_map_tiles') and MAP_TILE_PATTERN.search(url):
+        return True
+    return False
+
+def apply_routing_profile(context, profile='crawler') -> None:
+    """Install the blocking profile on a sync Playwright BrowserContext."""
+    profile = _resolve_profile(profile)
+    if not profile:
+        return
+
+    def handle(route):
+        request = route.request
+        if should_block(request.url, request.resource_type, profile):
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handle)
+
+async def apply_routing_profile_async(context, profile='crawler') -> None:
+    """Install the blocking profile on an async Playwright BrowserContext."""
+    profile = _resolve_profile(profile)
+    if not profile:
+        return
+
+    async def handle(route):
+        request = route.request
+        if should_block(request.url, request.resource_type, profile):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle)
@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+from glob import glob
+import json
+import csv
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, so do not run writers side by side there
+    fcntl = None
+
+# Keyed updates for results/<term>.csv are appended to results/<term>.csv.deltas.jsonl
+DELTA_SUFFIX = '.deltas.jsonl'
+
+
+def delta_path(csv_filename: str) -> str:
+    return csv_filename + DELTA_SUFFIX
+
+@contextmanager
+def csv_lock(csv_filename: str):
+    """
+    Exclusive lock on a result CSV, shared by every process that appends to or rewrites it.
+
+    index.py holds it while appending rows, and compact() holds it while swapping in the
+    merged file, so compaction never drops rows appended while it runs.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(csv_filename + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def read_csv_header(csv_filename: str) -> list[str]:
+    """Reads only the header row of a CSV file."""
+    if not os.path.exists(csv_filename):
+        return []
+    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+def append_deltas(csv_filename: str, updates: list[dict]) -> None:
+    """
+    Appends keyed field updates for rows of csv_filename.
+
+    Each update must carry the row's 'id' plus the fields to set. Cost is proportional to the
+    number of updates, not the size of the CSV; call compact() to merge them into the file.
+    """
+    if not updates:
+        return
+    with csv_lock(csv_filename), open(delta_path(csv_filename), 'a', encoding='utf-8') as f:
+        for update in updates:
+            f.write(json.dumps(update, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_deltas(csv_filename: str) -> dict[str, dict]:
+    """Merges every pending update by row id; later updates win."""
+    merged = {}
+    path = delta_path(csv_filename)
+    if not os.path.exists(path):
+        return merged
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                update = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-append; everything before it is intact
+                continue
+            row_id = update.get('id')
+            if row_id is not None:
+                merged.setdefault(row_id, {}).update(update)
+    return merged
+
+def iter_rows(csv_filename: str, deltas: dict = None):
+    """Yields CSV rows with any pending updates applied, without loading the file into memory."""
+    if deltas is None:
+        deltas = read_deltas(csv_filename)
+    if not os.path.exists(csv_filename):
+        return
+    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            update = deltas.get(row.get('id'))
+            if update:
+                row.update(update)
+            yield row
+
+def compact(csv_filename: str, extra_fields: list[str] = None) -> None:
+    """
+    Merges pending updates (and any missing columns) into the CSV in one streaming pass.
+
+    The merged file is written next to the original and swapped in atomically, then the
+    delta log is removed. Runs under csv_lock, so writers appending rows or deltas wait.
+    """
+    if not os.path.exists(csv_filename):
+        return
+    with csv_lock(csv_filename):
+        _compact(csv_filename, extra_fields)
+
+def _compact(csv_filename: str, extra_fields: list[str] = None) -> None:
+    deltas = read_deltas(csv_filename)
+    fieldnames = read_csv_header(csv_filename)
+    new_fields = list(extra_fields or [])
+    for update in deltas.values():
+        new_fields.extend(update.keys())
+    missing = [field for field in dict.fromkeys(new_fields) if field not in fieldnames]
+    if not deltas and not missing:
+        return
+
+    fieldnames = fieldnames + missing
+    tmp_filename = csv_filename + '.tmp'
+    with open(tmp_filename, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction='ignore', restval='')
+        writer.writeheader()
+        for row in iter_rows(csv_filename, deltas):
+            writer.writerow(row)
+    os.replace(tmp_filename, csv_filename)
+    if os.path.exists(delta_path(csv_filename)):
+        os.remove(delta_path(csv_filename))
+    if missing:
+        print(f"Added {', '.join(missing)} column(s) to {csv_filename}")
+
+def ensure_csv_column(csv_filename: str, column: str) -> None:
+    """Adds an empty column to the CSV if its header does not have it yet."""
+    if not os.path.exists(csv_filename):
+        return
+    if column not in read_csv_header(csv_filename):
+        compact(csv_filename, extra_fields=[column])
+
+def compact_all(directory: str = 'results') -> None:
+    """Merges the pending updates of every CSV in the directory."""
+    for path in glob(os.path.join(directory, '*.csv' + DELTA_SUFFIX)):
+        csv_filename = path[:-len(DELTA_SUFFIX)]
+        print(f"Compacting {csv_filename}...")
+        compact(csv_filename)
+
+if __name__ == '__main__':
+    compact_all(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results'))
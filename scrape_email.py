@@ -1,83 +1,242 @@
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-import re
-from urllib.parse import urljoin, urlparse
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from browser_pool import BrowserPool, get_browser_pool
+from result_store import ensure_csv_column
+from email_cache import get_email_cache
+from email_extraction import extract_emails, parse_mailto
+from crawl_frontier import CrawlFrontier, rank_relevant_links, CONTACT_KEYWORDS
+from http_scrape_email import scrape_website_for_emails_http
+from consent import dismiss_consent_banner
+from metrics import EMAIL_CACHE_REQUESTS, SITES_CRAWLED, CRAWL_SECONDS, PAGES_PER_SITE
+from urllib.parse import urlparse
 import time
-import csv
-import os
 
 def ensure_csv_has_email_column(csv_filename):
     """Ensure the CSV file has an email column, add if missing."""
-    if not os.path.exists(csv_filename):
-        return
-    
-    # Read the current CSV content
-    rows = []
-    fieldnames = None
-    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        rows = list(reader)
-    
-    # Check if email column exists
-    if 'email' not in fieldnames:
-        fieldnames.append('email')
-        # Add empty email field to existing rows
-        for row in rows:
-            row['email'] = ''
-        
-        # Write back the updated content
-        with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-            print(f"Added email column to {csv_filename}")
-
-
-# Regex to find email addresses (case-insensitive)
-EMAIL_REGEX = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+    ensure_csv_column(csv_filename, 'email')
+
 
 def extract_emails_from_text(text: str) -> set[str]:
-    """Extracts email addresses from a given text using regex."""
-    return set(re.findall(EMAIL_REGEX, text, re.IGNORECASE))
+    """Extracts email addresses from a given text. See email_extraction.extract_emails."""
+    return extract_emails(text)
 
-def get_relevant_internal_links(page, base_url: str, keywords: list[str]) -> list[str]:
+# Contact-like pages a single site crawl loads at once, each in its own tab
+PARALLEL_CONTACT_PAGES = 3
+
+def filter_relevant_links(anchors: list[tuple[str, str]], base_url: str, keywords: list[str]) -> list[str]:
     """
-    Finds internal HTTP/HTTPS links on the page whose text or href contains specified keywords.
+    Filters (href, text) anchor pairs down to internal HTTP/HTTPS links whose text or href contains a keyword,
+    most promising first.
     """
-    links = set()
-    parsed_base_url = urlparse(base_url)
-    
-    try:
-        link_elements = page.query_selector_all("a[href]")
-        for link_el in link_elements:
-            href = link_el.get_attribute("href")
-            text = (link_el.inner_text() or "").lower()
-            
-            if not href or href.startswith(("javascript:", "#", "tel:", "data:")):
-                continue
+    return [url for _, url in rank_relevant_links(anchors, base_url, keywords)]
+
+# Collects everything a page visit needs in one round-trip. Only anchors whose href or text
+# contains a keyword are returned, so the payload stays small on link-heavy pages.
+HARVEST_SCRIPT = """
+(keywords) => {
+    const mailtos = [];
+    const anchors = new Map();
+    for (const a of document.querySelectorAll('a[href]')) {
+        const href = a.getAttribute('href') || '';
+        if (href.toLowerCase().startsWith('mailto:')) { mailtos.push(href); continue; }
+        const text = (a.textContent || a.getAttribute('aria-label') || a.title || '').replace(/\\s+/g, ' ').trim();
+        const haystack = (href + ' ' + text).toLowerCase();
+        if (!keywords.some((keyword) => haystack.includes(keyword))) continue;
+        anchors.set(a.href, ((anchors.get(a.href) || '') + ' ' + text).trim());
+    }
+    return {
+        html: document.documentElement ? document.documentElement.outerHTML : '',
+        mailtos: mailtos,
+        anchors: Array.from(anchors.entries())
+    };
+}
+"""
+
+def _process_harvest(payload: dict, base_url: str, keywords: list[str]) -> tuple[set[str], set[str], list[tuple[float, str]]]:
+    emails_from_content = extract_emails_from_text(payload.get('html') or '')
+    mailto_emails = {email for email in map(parse_mailto, payload.get('mailtos') or []) if email}
+    candidate_links = rank_relevant_links([tuple(anchor) for anchor in payload.get('anchors') or []], base_url, keywords)
+    return emails_from_content, mailto_emails, candidate_links
+
+def harvest_page(page, base_url: str, keywords: list[str] = CONTACT_KEYWORDS) -> tuple[set[str], set[str], list[tuple[float, str]]]:
+    """
+    Harvests a loaded sync Playwright page with a single page.evaluate call.
 
-            full_url = urljoin(base_url, href)
-            parsed_full_url = urlparse(full_url)
+    Returns:
+        (emails found in the HTML, emails from mailto: links, ranked (score, url) contact-like links).
+    """
+    return _process_harvest(page.evaluate(HARVEST_SCRIPT, keywords), base_url, keywords)
 
-            if parsed_full_url.scheme not in ['http', 'https'] or not parsed_full_url.netloc.endswith(parsed_base_url.netloc):
-                continue
-            
-            link_path_query = (parsed_full_url.path + "?" + parsed_full_url.query).lower()
-            for keyword in keywords:
-                if keyword in text or keyword in link_path_query:
-                    links.add(full_url)
-                    break 
-                    
+async def harvest_page_async(page, base_url: str, keywords: list[str] = CONTACT_KEYWORDS) -> tuple[set[str], set[str], list[tuple[float, str]]]:
+    """Async counterpart of harvest_page."""
+    return _process_harvest(await page.evaluate(HARVEST_SCRIPT, keywords), base_url, keywords)
+
+def get_page_anchors(page) -> list[tuple[str, str]]:
+    """The (href, text) pairs of every link on the page."""
+    try:
+        anchors = page.eval_on_selector_all("a[href]", "els => els.map(e => [e.getAttribute('href'), e.innerText || ''])")
+        return [tuple(anchor) for anchor in anchors]
     except Exception as e:
         print(f"Error extracting links from {page.url}: {e}")
-    return list(links)
+        return []
+
+def get_relevant_internal_links(page, base_url: str, keywords: list[str]) -> list[str]:
+    """
+    Finds internal HTTP/HTTPS links on the page whose text or href contains specified keywords, most promising first.
+    """
+    return filter_relevant_links(get_page_anchors(page), base_url, keywords)
+
+def _start_navigation(page, url: str) -> None:
+    """Points the tab at url and returns at once, without waiting for the server to respond."""
+    page.evaluate("(url) => { window.location.href = url; }", url)
+
+def _new_tab(context):
+    """Opens a crawl tab that closes itself when a link turns out to be a download (e.g. a contact PDF)."""
+    tab = context.new_page()
+
+    def on_download(download):
+        # The URL never changes for a download, so closing the tab is what ends the wait on it
+        print(f"  Skipping {download.url}: it is a download, not a page.")
+        try:
+            download.cancel()
+            tab.close()
+        except Exception:
+            pass
+
+    tab.on("download", on_download)
+    return tab
+
+def _close_tabs(tabs) -> None:
+    """Closes the tabs, aborting any navigation still in flight."""
+    for tab in tabs:
+        try:
+            tab.close()
+        except Exception:
+            pass
+
+def _crawl_site_for_emails(
+    context,
+    initial_url: str,
+    search_contact_pages: bool,
+    max_depth: int,
+    max_contact_links_per_page: int,
+    min_emails_required: int,
+    crawl_info: dict = None,
+    parallel_pages: int = PARALLEL_CONTACT_PAGES
+) -> list[str]:
+    """
+    Crawls a single website inside a borrowed browser context. See scrape_website_for_emails.
+
+    The homepage is loaded first. After that the parallel_pages most promising contact-like
+    links are loaded at once in separate tabs. Once min_emails_required is met, the tabs still
+    loading are closed.
+    """
+    all_emails_found = set()
+    visited_urls = set()
+    early_exit_triggered = False # Flag to signal early exit
+
+    parsed_initial_url = urlparse(initial_url)
+    base_domain = parsed_initial_url.netloc
+
+    frontier = CrawlFrontier(initial_url)
+    if crawl_info is None:
+        crawl_info = {}
+    crawl_info['visited_urls'] = visited_urls
+    crawl_info['emails'] = all_emails_found  # Kept by the caller if the crawl fails midway
+
+    tabs = []
+
+    while frontier:
+        batch = []
+        batch_size = 1 if not visited_urls else max(1, parallel_pages)
+        while frontier and len(batch) < batch_size:
+            current_url, current_depth = frontier.pop()
+            if urlparse(current_url).netloc != base_domain:
+                print(f"Skipping {current_url} as it's off the initial domain {base_domain}.")
+                continue
+            batch.append((current_url, current_depth))
+        tabs = [tab for tab in tabs if not tab.is_closed()]
+        while len(tabs) < len(batch):
+            tabs.append(_new_tab(context))
+
+        # Start every navigation before waiting on any of them, so the tabs' requests are in
+        # flight together. A lone tab (the homepage) uses goto to get the response status.
+        loading = []
+        for page, (current_url, current_depth) in zip(tabs, batch):
+            visited_urls.add(current_url)
+            print(f"\nVisiting: {current_url} (Depth: {current_depth})")
+            try:
+                if len(batch) == 1:
+                    response = page.goto(current_url, wait_until="commit")
+                    if current_depth == 0 and response is not None:
+                        crawl_info['http_status'] = response.status
+                    loading.append((page, current_url, current_depth, None))
+                else:
+                    previous_url = page.url
+                    _start_navigation(page, current_url)
+                    loading.append((page, current_url, current_depth, previous_url))
+            except PlaywrightTimeoutError as e_timeout:
+                print(f"Timeout error loading or interacting with page: {current_url} - {e_timeout}")
+            except Exception as e_page:
+                print(f"Error processing page {current_url}: {e_page}")
+
+        for page, current_url, current_depth, previous_url in loading:
+            try:
+                if previous_url is None:
+                    page.wait_for_load_state("domcontentloaded")
+                else:
+                    # Done once the tab has left the page it was showing and parsed the new one
+                    page.wait_for_url(lambda url, previous_url=previous_url: url != previous_url, wait_until="domcontentloaded")
+                if current_depth == 0 and urlparse(page.url).netloc != base_domain:
+                    # Follow the homepage redirect (e.g. example.com -> www.example.com)
+                    base_domain = urlparse(page.url).netloc
+                banner = dismiss_consent_banner(page)
+                if banner:
+                    print(f"  Dismissed {banner} consent banner.")
+
+                # Links come back resolved against page.url, which may differ from current_url after a redirect
+                emails_from_content, mailto_emails, candidate_links = harvest_page(page, page.url)
+                if emails_from_content:
+                    print(f"  Found emails in content: {emails_from_content}")
+                if mailto_emails:
+                    print(f"  Found mailto emails: {mailto_emails}")
+                all_emails_found.update(emails_from_content, mailto_emails)
+                if min_emails_required is not None and len(all_emails_found) >= min_emails_required:
+                    print(f"  Minimum required emails ({min_emails_required}) reached. Will stop after this page.")
+                    early_exit_triggered = True
+
+                if not early_exit_triggered: # Only add new links if not already planning to exit
+                    if search_contact_pages and current_depth < max_depth:
+                        added_links_count = frontier.add_links(candidate_links, current_depth + 1, max_contact_links_per_page)
+                        if candidate_links:
+                            print(f"  Found {len(candidate_links)} potential contact-like links. Added {added_links_count} to queue.")
+
+            except PlaywrightTimeoutError as e_timeout:
+                print(f"Timeout error loading or interacting with page: {current_url} - {e_timeout}")
+            except Exception as e_page:
+                if not page.is_closed():  # Closed tabs were downloads, already reported
+                    print(f"Error processing page {current_url}: {e_page}")
+
+            if early_exit_triggered:
+                break
+
+        if early_exit_triggered: # Stop the remaining tabs of this batch and don't start another
+            _close_tabs(tabs)
+            print(f"Minimum email count ({len(all_emails_found)}/{min_emails_required if min_emails_required else 'N/A'}) met or exceeded. Stopping further URL visits.")
+            break 
+
+        time.sleep(0.5)
+
+    return sorted(list(all_emails_found))
 
 def scrape_website_for_emails(
     initial_url: str, 
     search_contact_pages: bool = True, 
     max_depth: int = 1,
     max_contact_links_per_page: int = 5,
-    min_emails_required: int = None  # New parameter for early exit
+    min_emails_required: int = None,  # New parameter for early exit
+    pool: BrowserPool = None,
+    http_first: bool = True,
+    use_cache: bool = True
 ) -> list[str]:
     """
     Scrapes a website for email addresses.
@@ -88,134 +247,89 @@ def scrape_website_for_emails(
         max_depth: How many levels of internal "contact-like" links to follow.
         max_contact_links_per_page: Max new contact-like links to explore from each page.
         min_emails_required: If set, stop scraping once this many unique emails are found.
+        pool: Browser pool to borrow a context from. Defaults to the shared process-wide pool.
+        http_first: Try plain HTTP requests first and only render the site in a browser when
+            the static HTML yields no emails or looks JS-rendered.
+        use_cache: Serve the result from the per-domain crawl cache when it is fresh, and
+            store new results in it.
 
     Returns:
         A list of unique email addresses found.
     """
-    all_emails_found = set()
-    visited_urls = set()
-    early_exit_triggered = False # Flag to signal early exit
-
     if not initial_url.startswith(('http://', 'https://')):
         initial_url = 'https://' + initial_url
 
-    parsed_initial_url = urlparse(initial_url)
-    base_domain = parsed_initial_url.netloc
-
-    urls_to_visit = [(initial_url, 0)]
-    queued_urls_set = {initial_url} 
-
-    with sync_playwright() as p:
-        try:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36",
-                java_script_enabled=True
-            )
-            context.set_default_navigation_timeout(30000)
-            context.set_default_timeout(15000)
-            page = context.new_page()
-
-            while urls_to_visit:
-                if early_exit_triggered: # If flag set in previous iteration, stop processing new URLs
-                    print("Early exit condition met in previous URL processing. Halting crawl.")
-                    break
-
-                current_url, current_depth = urls_to_visit.pop(0)
-                queued_urls_set.remove(current_url)
-
-                if current_url in visited_urls:
-                    continue
-                
-                if urlparse(current_url).netloc != base_domain:
-                    print(f"Skipping {current_url} as it's off the initial domain {base_domain}.")
-                    continue
-
-                visited_urls.add(current_url)
-                print(f"\nVisiting: {current_url} (Depth: {current_depth})")
-
-                try:
-                    page.goto(current_url, wait_until="domcontentloaded")
-                    
-                    cookie_selectors = [
-                        "button:text-matches('Accept all', 'i')", "button:text-matches('Accept', 'i')",
-                        "button:text-matches('Agree', 'i')", "button:text-matches('Allow all', 'i')",
-                        "button:text-matches('Confirm', 'i')", "button:text-matches('OK', 'i')",
-                        "button[aria-label*='close' i]", "button[aria-label*='accept' i]",
-                        "div[id*='cookie'] button:text-matches('accept', 'i')"
-                    ]
-                    time.sleep(1)
-                    for selector in cookie_selectors:
-                        try:
-                            button = page.locator(selector).first
-                            if button.is_visible(timeout=1000):
-                                print(f"Attempting to click cookie/popup button matching: {selector}")
-                                button.click(timeout=3000)
-                                time.sleep(0.5)
-                                print("Clicked.")
-                                break 
-                        except PlaywrightTimeoutError: pass
-                        except Exception as e_cookie: print(f"Minor error with cookie selector '{selector}': {e_cookie}")
-
-                    page_content = page.content()
-                    emails_from_content = extract_emails_from_text(page_content)
-                    if emails_from_content:
-                        print(f"  Found emails in content: {emails_from_content}")
-                        all_emails_found.update(emails_from_content)
-                        if min_emails_required is not None and len(all_emails_found) >= min_emails_required:
-                            print(f"  Minimum required emails ({min_emails_required}) reached from content. Will stop after this page.")
-                            early_exit_triggered = True
-
-                    mailto_links = page.locator('a[href^="mailto:"]')
-                    for i in range(mailto_links.count()):
-                        mailto_link_element = mailto_links.nth(i)
-                        href = mailto_link_element.get_attribute("href")
-                        if href:
-                            email = href.replace("mailto:", "", 1).split("?")[0].strip()
-                            if re.fullmatch(EMAIL_REGEX, email):
-                                print(f"  Found mailto email: {email.lower()}")
-                                all_emails_found.add(email.lower())
-                                if min_emails_required is not None and len(all_emails_found) >= min_emails_required:
-                                    print(f"  Minimum required emails ({min_emails_required}) reached after mailto. Will stop after this page.")
-                                    early_exit_triggered = True 
-                                    # No break here, finish all mailtos on this page
-                    
-                    if not early_exit_triggered: # Only add new links if not already planning to exit
-                        if search_contact_pages and current_depth < max_depth:
-                            contact_keywords = ["contact", "about", "email", "mail", "impressum", "legal", "privacy", "terms", "support", "kontakt", "ueberuns", "team"]
-                            candidate_links = get_relevant_internal_links(page, current_url, contact_keywords)
-                            added_links_count = 0
-                            for contact_url in candidate_links:
-                                if contact_url not in visited_urls and contact_url not in queued_urls_set:
-                                    if added_links_count < max_contact_links_per_page:
-                                        urls_to_visit.append((contact_url, current_depth + 1))
-                                        queued_urls_set.add(contact_url)
-                                        added_links_count += 1
-                                    else:
-                                        print(f"  Reached max contact links ({max_contact_links_per_page}) to add from {current_url}")
-                                        break
-                            if candidate_links:
-                                print(f"  Found {len(candidate_links)} potential contact-like links. Added {added_links_count} to queue.")
-
-                except PlaywrightTimeoutError as e_timeout:
-                    print(f"Timeout error loading or interacting with page: {current_url} - {e_timeout}")
-                except Exception as e_page:
-                    print(f"Error processing page {current_url}: {e_page}")
-                
-                if early_exit_triggered: # If flag was set during this page's processing, break main loop
-                    print(f"Minimum email count ({len(all_emails_found)}/{min_emails_required if min_emails_required else 'N/A'}) met or exceeded. Stopping further URL visits.")
-                    break 
-
-                time.sleep(0.5)
-
-            browser.close()
-
-        except Exception as e_overall:
-            print(f"An overall error occurred: {e_overall}")
-            if 'browser' in locals() and browser.is_connected():
-                browser.close()
-                
-        return sorted(list(all_emails_found))
+    def crawl(url):
+        crawl_info = {}
+        emails = _scrape_website_for_emails_uncached(
+            url, search_contact_pages, max_depth, max_contact_links_per_page,
+            min_emails_required, pool, http_first, crawl_info
+        )
+        if emails is None:
+            return None
+        return emails, sorted(crawl_info.get('visited_urls', [])), crawl_info.get('http_status')
+
+    if not use_cache:
+        result = crawl(initial_url)
+        return result[0] if result else []
+
+    # One crawl per domain: cached, or shared with a thread already crawling it
+    emails, from_cache = get_email_cache().get_or_crawl(initial_url, crawl)
+    EMAIL_CACHE_REQUESTS.inc(result='hit' if from_cache else 'miss')
+    if from_cache:
+        print(f"Using cached crawl of {initial_url}: {emails}")
+    return emails or []
+
+def _scrape_website_for_emails_uncached(
+    initial_url, search_contact_pages, max_depth, max_contact_links_per_page,
+    min_emails_required, pool, http_first, crawl_info
+):
+    """
+    Tiered crawl behind scrape_website_for_emails. Emails the HTTP tier found are kept when
+    the site is escalated to the browser. If the browser crawl fails midway, the emails found
+    before the failure are returned; None only if the crawl failed with none.
+    """
+    http_emails = []
+    if http_first:
+        start = time.perf_counter()
+        emails, needs_browser = scrape_website_for_emails_http(
+            initial_url, search_contact_pages, max_depth, max_contact_links_per_page, min_emails_required,
+            crawl_info=crawl_info
+        )
+        _record_crawl('http', start, crawl_info, 'found' if emails and not needs_browser else 'escalated')
+        if emails and not needs_browser:
+            print(f"Found emails for {initial_url} over plain HTTP: {emails}")
+            return emails
+        http_emails = emails or []
+        print(f"Escalating {initial_url} to the browser ({'JS-rendered page' if needs_browser else 'no emails in static HTML'}).")
+
+    if pool is None:
+        pool = get_browser_pool()
+
+    start = time.perf_counter()
+    try:
+        emails = pool.run(
+            _crawl_site_for_emails,
+            initial_url,
+            search_contact_pages,
+            max_depth,
+            max_contact_links_per_page,
+            min_emails_required,
+            crawl_info
+        )
+    except Exception as e_overall:
+        print(f"An overall error occurred: {e_overall}")
+        _record_crawl('browser', start, crawl_info, 'failed')
+        partial = set(http_emails) | set(crawl_info.get('emails', ()))
+        return sorted(partial) if partial else None
+    _record_crawl('browser', start, crawl_info, 'found' if emails else 'empty')
+    # The browser may find less than the static HTML did (bot walls, timeouts)
+    return sorted(set(http_emails) | set(emails))
+
+def _record_crawl(tier: str, start: float, crawl_info: dict, outcome: str) -> None:
+    SITES_CRAWLED.inc(tier=tier, outcome=outcome)
+    CRAWL_SECONDS.observe(time.perf_counter() - start, tier=tier)
+    PAGES_PER_SITE.observe(len(crawl_info.get('visited_urls', ())), tier=tier)
 
 
 
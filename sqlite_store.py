@@ -0,0 +1,37 @@
+import sqlite3
+
+# Wait this long for another thread or process to release the database before failing
+BUSY_TIMEOUT_SECONDS = 30
+
+
+def open_sqlite(path: str, schema: str = None) -> sqlite3.Connection:
+    """
+    Opens the SQLite file shared by every thread and worker process the way all our stores use it.
+
+    WAL mode lets readers run alongside the single writer, synchronous=NORMAL is crash-safe
+    under WAL, and autocommit mode (isolation_level=None) leaves transactions to the caller.
+    The connection may be used from any thread; callers serialize access with their own lock.
+    """
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_SECONDS * 1000}")
+    if schema:
+        conn.executescript(schema)
+    return conn
+
+def evict_lru(conn: sqlite3.Connection, table: str, max_entries: int, key: str = 'domain') -> int:
+    """
+    Deletes the least recently used rows (by their last_access column) beyond max_entries.
+
+    Returns:
+        The number of rows deleted.
+    """
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    if count <= max_entries:
+        return 0
+    conn.execute(
+        f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {table} ORDER BY last_access LIMIT ?)",
+        (count - max_entries,)
+    )
+    return count - max_entries
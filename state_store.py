@@ -0,0 +1,136 @@
+from threading import Lock
+from sqlite_store import open_sqlite
+import json
+import time
+
+STATE_DB_PATH = 'scraper_state.db'
+
+# Lifecycle of a place record inside the store
+STAGE_PENDING = 'pending'     # Scraped from Maps, waiting for email enrichment
+STAGE_ENRICHED = 'enriched'   # Enriched, waiting to be written to its CSV
+STAGE_WRITTEN = 'written'     # Persisted in the CSV
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS term_progress (
+    search_term TEXT PRIMARY KEY,
+    scroll_count INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'in_progress',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seen_cards (
+    search_term TEXT NOT NULL,
+    card_id TEXT NOT NULL,
+    PRIMARY KEY (search_term, card_id)
+);
+CREATE TABLE IF NOT EXISTS records (
+    search_term TEXT NOT NULL,
+    id TEXT NOT NULL,
+    csv_filename TEXT NOT NULL,
+    data TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (search_term, id)
+);
+CREATE INDEX IF NOT EXISTS records_stage ON records (stage);
+"""
+
+
+class StateStore:
+    """
+    Crash-safe progress for Maps scraping, kept in SQLite (WAL mode).
+
+    Every change is committed immediately, so a killed run loses at most the
+    card it was working on. Several threads share one connection behind a lock;
+    worker processes each open their own connection to the same file.
+    """
+
+    def __init__(self, path: str = STATE_DB_PATH):
+        self.path = path
+        self._lock = Lock()
+        self._conn = open_sqlite(path, SCHEMA)
+
+    def _write(self, statements):
+        """Run (sql, params) statements in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Term progress
+
+    def get_scroll_count(self, search_term: str) -> int:
+        rows = self._query("SELECT scroll_count FROM term_progress WHERE search_term = ?", (search_term,))
+        return rows[0][0] if rows else 0
+
+    def record_scroll(self, search_term: str, scroll_count: int) -> None:
+        self._write([(
+            "INSERT INTO term_progress (search_term, scroll_count, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(search_term) DO UPDATE SET scroll_count = excluded.scroll_count, updated_at = excluded.updated_at",
+            (search_term, scroll_count, time.time())
+        )])
+
+    def complete_term(self, search_term: str) -> None:
+        """
+        The term's CSV is now the source of truth; drop its scroll position and per-card state,
+        so re-running the term later starts from the top of the feed.
+        """
+        self._write([
+            ("DELETE FROM term_progress WHERE search_term = ?", (search_term,)),
+            ("DELETE FROM seen_cards WHERE search_term = ?", (search_term,)),
+            ("DELETE FROM records WHERE search_term = ? AND stage = ?", (search_term, STAGE_WRITTEN)),
+        ])
+
+    # Cards
+
+    def seen_card_ids(self, search_term: str) -> set[str]:
+        return {row[0] for row in self._query("SELECT card_id FROM seen_cards WHERE search_term = ?", (search_term,))}
+
+    def mark_card_seen(self, search_term: str, card_id: str, place_data: dict = None, csv_filename: str = None) -> None:
+        """Record a handled card; with place_data it is also queued as a pending record in the same commit."""
+        statements = [("INSERT OR IGNORE INTO seen_cards (search_term, card_id) VALUES (?, ?)", (search_term, card_id))]
+        if place_data is not None:
+            statements.append((
+                "INSERT OR REPLACE INTO records (search_term, id, csv_filename, data, stage, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (search_term, place_data['id'], csv_filename, json.dumps(place_data), STAGE_PENDING, time.time())
+            ))
+        self._write(statements)
+
+    # Records
+
+    def mark_enriched(self, place_data: dict) -> None:
+        self._write([(
+            "UPDATE records SET data = ?, stage = ?, updated_at = ? WHERE search_term = ? AND id = ?",
+            (json.dumps(place_data), STAGE_ENRICHED, time.time(), place_data.get('search_term'), place_data['id'])
+        )])
+
+    def mark_written(self, records: list[dict]) -> None:
+        now = time.time()
+        self._write([
+            ("UPDATE records SET stage = ?, updated_at = ? WHERE search_term = ? AND id = ?",
+             (STAGE_WRITTEN, now, record.get('search_term'), record['id']))
+            for record in records
+        ])
+
+    def unfinished_records(self, search_terms: list[str]) -> list[tuple[str, dict, str]]:
+        """(stage, place_data, csv_filename) for every record of these terms not yet written."""
+        if not search_terms:
+            return []
+        placeholders = ','.join('?' * len(search_terms))
+        rows = self._query(
+            f"SELECT stage, data, csv_filename FROM records WHERE stage != ? AND search_term IN ({placeholders}) ORDER BY updated_at",
+            (STAGE_WRITTEN, *search_terms)
+        )
+        return [(stage, json.loads(data), csv_filename) for stage, data, csv_filename in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,20 +1,20 @@
-from playwright.sync_api import sync_playwright
 from scrape_email import scrape_website_for_emails
+from async_scrape_email import scrape_websites_for_emails
 import time
-import re
-import csv
-import os
 from concurrent.futures import ThreadPoolExecutor
 from glob import glob
+from result_store import append_deltas, compact, ensure_csv_column, iter_rows
+from metrics import METRICS_PORT, SUMMARY_INTERVAL_SECONDS, start_metrics_server, start_summary_reporter, stop_summary_reporter, summary
+
+# Crawl every record of a file concurrently on one browser instead of 4 worker threads
+USE_ASYNC_ENGINE = False
 
 def read_csv_without_emails(csv_filename):
     """Read records from CSV that don't have emails or have empty email fields."""
     records_to_update = []
-    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if not row.get('email') and row.get('website'):
-                records_to_update.append(row)
+    for row in iter_rows(csv_filename):
+        if not row.get('email') and row.get('website'):
+            records_to_update.append(row)
     return records_to_update
 
 def process_website_for_emails(record):
@@ -31,58 +31,14 @@ def process_website_for_emails(record):
     return record
 
 def update_csv_with_emails(csv_filename, updated_records):
-    """Update the CSV file with new email information."""
+    """Record new email information as keyed deltas; compact() merges them into the CSV."""
     if not updated_records:
         return
-
-    # Read all records from the original file
-    all_records = []
-    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        for row in reader:
-            all_records.append(row)
-
-    # Update records with new email information
-    updated_ids = {record['id']: record for record in updated_records}
-    for record in all_records:
-        if record['id'] in updated_ids:
-            record['email'] = updated_ids[record['id']]['email']
-
-    # Write all records back to the file
-    with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(all_records)
+    append_deltas(csv_filename, [{'id': record['id'], 'email': record['email']} for record in updated_records])
 
 def ensure_csv_has_email_column(csv_filename):
     """Ensure the CSV file has an email column, add if missing."""
-    if not os.path.exists(csv_filename):
-        return
-    
-    # Read the current CSV content
-    rows = []
-    fieldnames = None
-    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        rows = list(reader)
-    
-    # Check if email column exists
-    if 'email' not in fieldnames:
-        fieldnames.append('email')
-        # Add empty email field to existing rows
-        # Ensure all rows have the 'email' key
-        for row in rows:
-            if 'email' not in row:
-                row['email'] = ''
-        
-        # Write back the updated content
-        with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-            print(f"Added email column to {csv_filename}")
+    ensure_csv_column(csv_filename, 'email')
 
 def update_emails_in_csv():
     """Main function to update emails in all CSV files."""
@@ -93,6 +49,16 @@ def update_emails_in_csv():
         print("No CSV files found in the current directory.")
         return
 
+    start_metrics_server(METRICS_PORT)
+    start_summary_reporter(SUMMARY_INTERVAL_SECONDS)
+    started_at = time.time()
+    try:
+        _update_csv_files(csv_files)
+    finally:
+        stop_summary_reporter()
+        print(summary(started_at))
+
+def _update_csv_files(csv_files):
     for csv_filename in csv_files:
         print(f"\nProcessing {csv_filename}...")
         
@@ -104,10 +70,25 @@ def update_emails_in_csv():
         
         if not records_to_update:
             print(f"No records without emails found in {csv_filename}")
+            compact(csv_filename)  # Merge deltas left behind by an interrupted run
             continue
             
         print(f"Found {len(records_to_update)} records without emails")
         
+        if USE_ASYNC_ENGINE:
+            results = scrape_websites_for_emails(
+                [record['website'] for record in records_to_update],
+                max_depth=1,
+                min_emails_required=2
+            )
+            for record in records_to_update:
+                emails = results.get(record['website'], [])
+                record['email'] = ','.join(emails) if emails else ''
+            update_csv_with_emails(csv_filename, records_to_update)
+            compact(csv_filename)
+            print(f"Updated {len(records_to_update)} records in {csv_filename}")
+            continue
+
         # Process websites concurrently using ThreadPoolExecutor
         for i in range(0, len(records_to_update), 20):
             batch = records_to_update[i:i+20]
@@ -118,5 +99,8 @@ def update_emails_in_csv():
             # Clear updated records to avoid duplication
             updated_records.clear()
 
+        # Merge this run's email deltas into the CSV in a single pass
+        compact(csv_filename)
+
 if __name__ == '__main__':
     update_emails_in_csv()
\ No newline at end of file
@@ -1,33 +1,16 @@
 import dns.resolver
 import re # Fixed import
-import csv # Fixed import
 import os
-from typing import List, Set
 import concurrent.futures
 import multiprocessing # Added import
 import time # Added for retry delay
+from disposable_domains import is_disposable
+from dns_cache import get_mx_cache, get_resolver, answer_ttl, negative_ttl
+from result_store import append_deltas, compact, ensure_csv_column, iter_rows, read_csv_header
+from metrics import MX_CACHE_REQUESTS, DNS_SECONDS
 
-# Cache for MX record lookups
-MX_CACHE = {}
-CACHE_EXPIRY_SECONDS = 300  # Cache results for 5 minutes
-
-def load_disposable_domains() -> Set[str]:
-    """Load disposable email domains from the disposable_domain_list.txt file."""
-    domains = set()
-    list_path = os.path.join(os.path.dirname(__file__), 'disposable_domain_list.txt')
-    try:
-        with open(list_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                domain = line.strip().lower()
-                if domain:
-                    domains.add(domain)
-        return domains
-    except Exception as e:
-        print(f"Error loading disposable domains list: {e}")
-        return set()
-
-# Load disposable domains from file
-DISPOSABLE_DOMAINS = load_disposable_domains()
+# Number of valid_emails updates buffered before they are appended to the delta log
+DELTA_BATCH_SIZE = 100
 
 # Define max workers for the thread pool dynamically
 # Sets a minimum of 1 worker, uses the number of CPU cores if available and less than/equal to 32,
@@ -35,11 +18,14 @@ DISPOSABLE_DOMAINS = load_disposable_domains()
 CPU_CORES = multiprocessing.cpu_count()
 MAX_WORKERS = max(1, min(CPU_CORES, 32))
 
+# MX lookups are I/O bound, so the bulk resolver runs more threads than there are cores
+MX_LOOKUP_WORKERS = 64
+
 def is_disposable_domain(email: str) -> bool:
-    """Check if the email domain is a known disposable email service."""
+    """Check if the email domain, or a parent of it, is a known disposable email service."""
     try:
         domain = email.split('@')[1].lower()
-        return domain in DISPOSABLE_DOMAINS
+        return is_disposable(domain)
     except IndexError:
         return False
 
@@ -57,30 +43,41 @@ def has_valid_mx_record(domain: str) -> bool:
         # print(f"Domain {domain} is whitelisted, skipping MX check.")
         return True
 
-    resolver = dns.resolver.Resolver()
-    resolver.nameservers = ['8.8.8.8', '8.8.4.4', '1.1.1.1', '1.0.0.1'] # Google and Cloudflare DNS
-    resolver.lifetime = 3  # Set timeout to 3 seconds for each query
-    resolver.timeout = 1   # Set timeout for each individual server query to 1 second
+    # Check the persistent cache first; entries expire with the DNS answer's own TTL
+    cache = get_mx_cache()
+    cached_result = cache.get(domain)
+    if cached_result is not None:
+        MX_CACHE_REQUESTS.inc(result='hit')
+        return cached_result
+    MX_CACHE_REQUESTS.inc(result='miss')
 
+    resolver = get_resolver()
     max_retries = 3
-    # Check cache first
-    if domain in MX_CACHE:
-        cached_result, timestamp = MX_CACHE[domain]
-        if time.time() - timestamp < CACHE_EXPIRY_SECONDS:
-            # print(f"Returning cached MX record result for {domain}: {cached_result}")
-            return cached_result
-
     for attempt in range(max_retries):
+        start = time.perf_counter()
         try:
-            resolver.resolve(domain, 'MX')
-            MX_CACHE[domain] = (True, time.time()) # Cache positive result
+            answer = resolver.resolve(domain, 'MX')
+            DNS_SECONDS.observe(time.perf_counter() - start, outcome='mx')
+            cache.put(domain, True, answer_ttl(answer)) # Cache positive result
             return True
-        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
             # These are definitive 'no MX record' or 'domain does not exist' answers
             # print(f"No MX record or domain not found for {domain} on attempt {attempt + 1}")
-            MX_CACHE[domain] = (False, time.time()) # Cache negative result
+            DNS_SECONDS.observe(time.perf_counter() - start, outcome='no_mx')
+            cache.put(domain, False, negative_ttl(e)) # Cache negative result
             return False
+        except dns.resolver.NoNameservers:
+            # SERVFAIL or every nameserver failed: usually transient, so retry and never persist it
+            DNS_SECONDS.observe(time.perf_counter() - start, outcome='servfail')
+            print(f"No nameserver answered for {domain} on attempt {attempt + 1}. Retrying if possible...")
+            if attempt < max_retries - 1:
+                time.sleep(0.5)
+            else:
+                print(f"DNS query for {domain} failed after {max_retries} attempts; no nameserver answered.")
+                cache.put_transient_failure(domain)
+                return False
         except dns.exception.Timeout:
+            DNS_SECONDS.observe(time.perf_counter() - start, outcome='timeout')
             print(f"DNS query timed out for {domain} on attempt {attempt + 1}. Retrying if possible...")
             if attempt < max_retries - 1:
                 time.sleep(0.5) # Wait a bit before retrying
@@ -96,11 +93,10 @@ def has_valid_mx_record(domain: str) -> bool:
                 print(f"DNS query for {domain} failed after {max_retries} attempts due to other errors.")
                 # Do not cache other errors as they might be transient
                 return False
-    MX_CACHE[domain] = (False, time.time()) # Fallback, cache as false if all retries fail
     return False
 
-def is_valid_email(email: str) -> bool:
-    """Validate an email address by checking format, disposable domain, and MX record."""
+def passes_local_checks(email: str) -> bool:
+    """Format and disposable-domain checks, which need no network access."""
     # Basic email format validation
     email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     if not re.match(email_regex, email):
@@ -109,6 +105,12 @@ def is_valid_email(email: str) -> bool:
     # Check if it's from a disposable domain
     if is_disposable_domain(email):
         return False
+    return True
+
+def is_valid_email(email: str) -> bool:
+    """Validate an email address by checking format, disposable domain, and MX record."""
+    if not passes_local_checks(email):
+        return False
     
     # Check MX record
     domain = email.split('@')[1]
@@ -116,88 +118,84 @@ def is_valid_email(email: str) -> bool:
 
 def ensure_valid_emails_column(csv_filename: str) -> None:
     """Ensure the CSV file has a valid_emails column, add if missing."""
-    if not os.path.exists(csv_filename):
+    ensure_csv_column(csv_filename, 'valid_emails')
+
+def _split_emails(email_str: str) -> list[str]:
+    return [e.strip() for e in (email_str or '').split(',') if e.strip()]
+
+def resolve_domains(domains: set[str]) -> dict[str, bool]:
+    """Resolve every domain's MX verdict once, on a single long-lived thread pool."""
+    verdicts = {}
+    if not domains:
+        return verdicts
+    print(f"Resolving MX records for {len(domains)} unique domains with {MX_LOOKUP_WORKERS} workers...")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MX_LOOKUP_WORKERS) as executor:
+        future_to_domain = {executor.submit(has_valid_mx_record, domain): domain for domain in domains}
+        for future in concurrent.futures.as_completed(future_to_domain):
+            domain = future_to_domain[future]
+            try:
+                verdicts[domain] = future.result()
+            except Exception as exc:
+                print(f'{domain} generated an exception: {exc}')
+                verdicts[domain] = False
+    return verdicts
+
+def validate_csv_files(csv_filenames: list[str]) -> None:
+    """
+    Bulk validation: collect the unique email domains of every file, resolve each domain
+    once, then apply the verdicts to all rows in one pass per file.
+    """
+    csv_filenames = [f for f in csv_filenames if os.path.exists(f) and read_csv_header(f)]
+    if not csv_filenames:
+        print("No CSV files with a header to validate.")
         return
-    
-    # Read the current CSV content
-    rows = []
-    fieldnames = None
-    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        rows = list(reader)
-    
-    # Check if valid_emails column exists
-    if 'valid_emails' not in fieldnames:
-        fieldnames.append('valid_emails')
-        # Add empty valid_emails field to existing rows
-        for row in rows:
-            row['valid_emails'] = ''
-        
-        # Write back the updated content
-        with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-            print(f"Added valid_emails column to {csv_filename}")
+
+    # Pass 1: unique domains of emails that pass the local checks
+    locally_valid = {}
+    domains = set()
+    for csv_filename in csv_filenames:
+        for row in iter_rows(csv_filename):
+            for email in _split_emails(row.get('email')):
+                if email not in locally_valid:
+                    locally_valid[email] = passes_local_checks(email)
+                    if locally_valid[email]:
+                        domains.add(email.split('@')[1].lower())
+
+    # Pass 2: one saturated pass over the domains
+    verdicts = resolve_domains(domains)
+
+    # Pass 3: apply verdicts as keyed deltas, then merge them into each CSV once
+    for csv_filename in csv_filenames:
+        updates = []
+        for row in iter_rows(csv_filename):
+            valid_emails = [
+                email for email in _split_emails(row.get('email'))
+                if locally_valid.get(email) and verdicts.get(email.split('@')[1].lower())
+            ]
+            valid_str = ','.join(valid_emails) if valid_emails else ''
+            if row.get('valid_emails') != valid_str:
+                updates.append({'id': row['id'], 'valid_emails': valid_str})
+            if len(updates) >= DELTA_BATCH_SIZE:
+                append_deltas(csv_filename, updates)
+                updates = []
+        append_deltas(csv_filename, updates)
+        compact(csv_filename, extra_fields=['valid_emails'])
+        print(f"Updated valid emails in {csv_filename}.")
 
 def validate_emails_in_csv(csv_filename: str) -> None:
     """Process a CSV file to validate emails and update the valid_emails column using concurrency."""
     if not os.path.exists(csv_filename):
         print(f"File not found: {csv_filename}")
         return
-
-    # Ensure the valid_emails column exists
-    ensure_valid_emails_column(csv_filename)
-
-    rows = []
-    fieldnames = None # Initialize fieldnames
-    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames # Capture fieldnames here
-        # Check if fieldnames is None (empty file) and handle
-        if fieldnames is None:
-            print(f"CSV file {csv_filename} is empty or has no header.")
-            return
-            
-        for row in reader:
-            email_str = row.get('email', '')
-            if email_str:
-                emails_to_validate = [e.strip() for e in email_str.split(',') if e.strip()]
-                valid_emails = []
-                if emails_to_validate:
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                        future_to_email = {executor.submit(is_valid_email, email): email for email in emails_to_validate}
-                        for future in concurrent.futures.as_completed(future_to_email):
-                            email = future_to_email[future]
-                            try:
-                                if future.result():
-                                    valid_emails.append(email)
-                            except Exception as exc:
-                                print(f'{email} generated an exception: {exc}')
-                row['valid_emails'] = ','.join(valid_emails) if valid_emails else ''
-            else:
-                row['valid_emails'] = ''
-            rows.append(row)
-
-    # Write the updated content back to the CSV
-    # Ensure fieldnames is not None before using it
-    if fieldnames:
-        with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-            print(f"Updated valid emails in {csv_filename} using concurrent processing.")
-    else:
-        print(f"Could not write to {csv_filename} as fieldnames were not determined.")
+    validate_csv_files([csv_filename])
 
 def process_all_csv_files(directory: str) -> None:
-    """Process all CSV files in the given directory."""
-    for filename in os.listdir(directory):
-        if filename.endswith('.csv'):
-            csv_path = os.path.join(directory, filename)
-            print(f"\nProcessing {filename}...")
-            validate_emails_in_csv(csv_path)
+    """Validate every CSV file in the given directory in a single bulk pass."""
+    csv_filenames = sorted(
+        os.path.join(directory, filename) for filename in os.listdir(directory) if filename.endswith('.csv')
+    )
+    print(f"Validating {len(csv_filenames)} CSV files...")
+    validate_csv_files(csv_filenames)
 
 if __name__ == '__main__':
     results_dir = os.path.join(os.path.dirname(__file__), 'results')